@@ -1,18 +1,74 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS 
 import onnxruntime as ort
 import numpy as np
 import os
-import joblib
-from datetime import datetime, timedelta
+import re
+from datetime import date, datetime, timedelta
+import atexit
 import hashlib
+import logging
+import hmac
 import secrets
 import sqlite3
 import threading
 import time
+import queue
+import random
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from functools import lru_cache
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:  # optional; Flask's built-in json provider is used without it
+    orjson = None
+
+# Per-request debug output; set LOG_LEVEL=DEBUG to see it. The logger has its
+# own handler so the root logger (and werkzeug's request log) keep their defaults.
+logger = logging.getLogger("demand_forecast")
+logger.setLevel(os.environ.get("LOG_LEVEL", "WARNING").upper())
+logger.addHandler(logging.StreamHandler())
+logger.propagate = False
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, so jsonify, request.get_json and the
+    streamed listings encode/decode in C. Keys stay sorted and dates still go
+    through Flask's default() so responses keep the same shape.
+    """
+    def _options(self, indent=None):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop("indent", None)
+        kwargs.pop("separators", None)
+        if kwargs:
+            return super().dumps(obj, indent=indent, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options(indent)).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 # Create a Flask web server instance.
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app) # Enable CORS for all origins
 
 
@@ -58,29 +114,216 @@ MODEL_ASSET_MAPPING = {
 # Dictionary to hold the loaded models, scalers, and column names
 LOADED_MODELS = {}
 
+def _normalize_column_key(key):
+    """Canonical form of a column name or lookup key: lower-cased, with runs of
+    spaces/underscores collapsed to one underscore and outer whitespace dropped."""
+    return '_'.join(str(key).replace('_', ' ').lower().split())
+
+# Categorical input values repeat across models and requests; normalize each once
+_normalize_ohe_value = lru_cache(maxsize=1024)(_normalize_column_key)
+
+# Prefixes of the one-hot encoded categorical columns
+OHE_PREFIXES = ("Location_", "Substation_Type_", "Circuit_Type_", "Geographical_Zone_", "Taxes_Applicable_")
+
+def _build_ohe_index(columns):
+    """Partition the one-hot columns by prefix into {prefix: {normalized value: column index}}."""
+    ohe_index = {prefix: {} for prefix in OHE_PREFIXES}
+    stems = [(prefix, _normalize_column_key(prefix) + '_') for prefix in OHE_PREFIXES]
+    for i, col in enumerate(columns):
+        key = _normalize_column_key(col)
+        for prefix, stem in stems:
+            if key.startswith(stem):
+                ohe_index[prefix].setdefault(key[len(stem):], i)
+    return ohe_index
+
+def _scaler_params(scaler, n_features):
+    """Return float32 (mean, inv_scale) such that transform(x) == (x - mean) * inv_scale."""
+    if hasattr(scaler, "min_"):
+        # MinMaxScaler: x * scale_ + min_
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+        return (-np.asarray(scaler.min_) / scale).astype(np.float32), scale.astype(np.float32)
+    mean = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+    scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean)
+    inv_scale = np.ones(n_features) if scale is None else 1.0 / np.asarray(scale)
+    return mean.astype(np.float32), inv_scale.astype(np.float32)
+
+# int8 copies of the models written by quantize_models.py
+QUANTIZED_SUFFIX = ".int8.onnx"
+
+def _resolve_onnx_path(onnx_path):
+    """Prefer the quantized copy of a model when it exists and is newer than the float model."""
+    quantized_path = onnx_path[:-len(".onnx")] + QUANTIZED_SUFFIX
+    if os.path.exists(quantized_path) and os.path.getmtime(quantized_path) >= os.path.getmtime(onnx_path):
+        return quantized_path
+    return onnx_path
+
+def _register_shared_arena():
+    """
+    Registers one CPU arena with the ONNX Runtime environment. Sessions opt in
+    with session.use_env_allocators, so all of them draw intermediate tensors
+    from this arena instead of each reserving its own. The arena grows by what
+    is requested rather than doubling, since batch-1 runs only need small chunks.
+    """
+    try:
+        mem_info = ort.OrtMemoryInfo("Cpu", ort.OrtAllocatorType.ORT_ARENA_ALLOCATOR, 0, ort.OrtMemType.DEFAULT)
+        # max_mem=0 (no limit), arena_extend_strategy=1 (kSameAsRequested), defaults for the rest
+        ort.create_and_register_allocator(mem_info, ort.OrtArenaCfg(0, 1, -1, -1))
+        return True
+    except Exception as e:
+        print(f"Could not register a shared ONNX Runtime arena, sessions use their own allocators: {e}")
+        return False
+
+SHARED_ARENA = _register_shared_arena()
+
+def _session_options():
+    sess_options = ort.SessionOptions()
+    # Every run is a single row through a small model; extra threads only add overhead
+    sess_options.intra_op_num_threads = 1
+    # Nodes run one after another on the calling thread, so no inter-op pool is
+    # started; concurrent requests each bring their own Flask thread instead
+    sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    sess_options.inter_op_num_threads = 1
+    # Idle pool threads sleep instead of spinning on a core between requests
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    sess_options.add_session_config_entry("session.inter_op.allow_spinning", "0")
+    # Batch-1 runs of tiny models get nothing back from a per-session arena or
+    # memory-pattern planning, but each of the seven sessions would reserve one
+    sess_options.enable_cpu_mem_arena = False
+    sess_options.enable_mem_pattern = False
+    if SHARED_ARENA:
+        sess_options.add_session_config_entry("session.use_env_allocators", "1")
+    # Keep quantized (QDQ) node groups on int8 kernels instead of falling back to float
+    sess_options.add_session_config_entry("session.qdq_is_int8_allowed", "1")
+    return sess_options
+
+def _create_session(onnx_path):
+    """
+    Creates a session for onnx_path. The first start saves the graph optimized
+    at ORT_ENABLE_EXTENDED next to the model as <model>.ext.onnx, with its
+    large initializers in <model>.ext.onnx.data; later starts load that copy
+    while it is newer than the model, and ONNX Runtime maps the weights file
+    instead of parsing the weights out of the protobuf.
+
+    The saved copy stops at the extended level: ORT_ENABLE_ALL adds layout
+    optimizations for the hardware it runs on, and ONNX Runtime warns that
+    such a graph should only be used where it was optimized. The copy stays
+    valid when the model directory moves to another host or image, and the
+    live session applies ORT_ENABLE_ALL on top of it when it loads.
+    """
+    optimized_path = onnx_path[:-len(".onnx")] + ".ext.onnx"
+
+    def is_current():
+        return os.path.exists(optimized_path) and os.path.getmtime(optimized_path) >= os.path.getmtime(onnx_path)
+
+    if not is_current():
+        sess_options = _session_options()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        sess_options.add_session_config_entry("session.optimized_model_external_initializers_file_name",
+                                              os.path.basename(optimized_path) + ".data")
+        sess_options.optimized_model_filepath = optimized_path
+        try:
+            ort.InferenceSession(onnx_path, sess_options=sess_options)
+        except Exception as e:
+            print(f"Could not save optimized model {optimized_path}: {e}")
+
+    sess_options = _session_options()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if is_current():
+        try:
+            return ort.InferenceSession(optimized_path, sess_options=sess_options)
+        except Exception as e:
+            print(f"Could not load optimized model {optimized_path}, using {onnx_path}: {e}")
+    return ort.InferenceSession(onnx_path, sess_options=sess_options)
+
+def _bind_output_buffers(session, io_binding, output_names):
+    """
+    Runs the binding once with ONNX Runtime allocating the outputs (doubling as
+    a warm-up run), then rebinds each output to a preallocated array of the same
+    shape and dtype. Later runs write into those arrays, which are returned.
+    """
+    session.run_with_iobinding(io_binding)
+    buffers = []
+    for name, output in zip(output_names, io_binding.get_outputs()):
+        buffer = np.empty_like(output.numpy())
+        # ortvalue_from_numpy wraps the array's memory without copying
+        io_binding.bind_ortvalue_output(name, ort.OrtValue.ortvalue_from_numpy(buffer))
+        buffers.append(buffer)
+    return buffers
+
+def _meta_path(model_name):
+    """Path of the compact scaler/columns file written by export_model_meta.py."""
+    return os.path.join(BASE_DIR, f"{model_name}_meta.npz")
+
+def _load_scaler_and_columns(model_name, paths):
+    """
+    Returns (columns, mean, inv_scale, scaler_type) for a model. Reads the
+    model's _meta.npz when it is newer than the joblib files, which avoids
+    importing joblib and unpickling sklearn objects at startup.
+    """
+    scaler_path = os.path.join(BASE_DIR, paths["scaler"])
+    columns_path = os.path.join(BASE_DIR, paths["columns"])
+    meta_path = _meta_path(model_name)
+    if os.path.exists(meta_path) and all(
+        os.path.getmtime(meta_path) >= os.path.getmtime(p) for p in (scaler_path, columns_path) if os.path.exists(p)
+    ):
+        with np.load(meta_path, allow_pickle=False) as meta:
+            return meta["columns"].tolist(), meta["mean"], meta["inv_scale"], str(meta["scaler_type"])
+
+    import joblib
+    scaler = joblib.load(scaler_path)
+    columns = joblib.load(columns_path)
+    mean, inv_scale = _scaler_params(scaler, len(columns))
+    return columns, mean, inv_scale, type(scaler).__name__
+
 # Load all assets once when the app starts.
 print("--- Loading All 7 Models ---")
 # Resolve assets relative to this file's directory so it works regardless of CWD
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 for model_name, paths in MODEL_ASSET_MAPPING.items():
     try:
-        onnx_path = os.path.join(BASE_DIR, paths["onnx"]) 
-        scaler_path = os.path.join(BASE_DIR, paths["scaler"]) 
-        columns_path = os.path.join(BASE_DIR, paths["columns"]) 
+        onnx_path = _resolve_onnx_path(os.path.join(BASE_DIR, paths["onnx"]))
 
-        session = ort.InferenceSession(onnx_path)
-        scaler = joblib.load(scaler_path)
-        columns = joblib.load(columns_path)
+        session = _create_session(onnx_path)
+        columns, mean, inv_scale, scaler_type = _load_scaler_and_columns(model_name, paths)
         
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
+
+        # Bind a preallocated (1, n_features) input and output once so the hot path
+        # only copies the scaled features in, calls run_with_iobinding and reads
+        # the output buffer; the first run also warms up lazy kernel setup.
+        input_ortvalue = ort.OrtValue.ortvalue_from_numpy(np.zeros((1, len(columns)), dtype=np.float32))
+        io_binding = session.io_binding()
+        io_binding.bind_ortvalue_input(input_name, input_ortvalue)
+        io_binding.bind_output(output_name, 'cpu')
+        output_buffer, = _bind_output_buffers(session, io_binding, [output_name])
+        
+        # Column lookup tables, built once instead of per request
+        col_index = {col: i for i, col in enumerate(columns)}
+        ohe_index = _build_ohe_index(columns)
+
+        # Only models exported with a variable batch dimension can take several rows per run
+        batch_dim = session.get_inputs()[0].shape[0]
+        batchable = not (isinstance(batch_dim, int) and batch_dim == 1)
         
         LOADED_MODELS[model_name] = {
             "session": session,
-            "scaler": scaler,
+            "onnx_path": onnx_path,
+            "scaler_type": scaler_type,
             "columns": columns,
+            "col_index": col_index,
+            "ohe_index": ohe_index,
+            "mean": mean,
+            "inv_scale": inv_scale,
             "input_name": input_name,
             "output_name": output_name,
+            "batchable": batchable,
+            "io_binding": io_binding,
+            "input_ortvalue": input_ortvalue,
+            "output_buffer": output_buffer,
+            # The binding owns single input/output buffers, so runs on it must not interleave
+            "io_lock": threading.Lock(),
         }
         print(f"Successfully loaded assets for: {model_name.upper()}")
 
@@ -92,137 +335,431 @@ if not LOADED_MODELS:
     exit(1)
 print("--- All necessary models loaded ---")
 
+# The same assets as parallel lists indexed by model id, for the prediction loops
+MODEL_NAMES = list(LOADED_MODELS)
+MODEL_ASSETS = [LOADED_MODELS[name] for name in MODEL_NAMES]
+SESSIONS = [assets["session"] for assets in MODEL_ASSETS]
+INPUT_NAMES = [assets["input_name"] for assets in MODEL_ASSETS]
+OUTPUT_NAMES = [[assets["output_name"]] for assets in MODEL_ASSETS]
+MEANS = [assets["mean"] for assets in MODEL_ASSETS]
+INV_SCALES = [assets["inv_scale"] for assets in MODEL_ASSETS]
+FEATURE_COUNTS = [len(assets["columns"]) for assets in MODEL_ASSETS]
+FORECAST_KEYS = [f"{name}_forecast" for name in MODEL_NAMES]
+# Models with identical column lists take the same feature vector: FEATURE_SOURCES[i]
+# is the first model id with model i's columns, so only that one is built per input
+_first_with_columns = {}
+FEATURE_SOURCES = [_first_with_columns.setdefault(tuple(assets["columns"]), i) for i, assets in enumerate(MODEL_ASSETS)]
+
+# Means and inverse scales stacked into (models, max features), zero-padded so the
+# unused tail of each model's row scales to 0
+MEANS_MATRIX = np.zeros((len(MODEL_NAMES), max(FEATURE_COUNTS)), dtype=np.float32)
+INV_SCALE_MATRIX = np.zeros_like(MEANS_MATRIX)
+for i, n_features in enumerate(FEATURE_COUNTS):
+    MEANS_MATRIX[i, :n_features] = MEANS[i]
+    INV_SCALE_MATRIX[i, :n_features] = INV_SCALES[i]
+
+def new_feature_scratch():
+    """A (models, max features) float32 buffer; row i[:FEATURE_COUNTS[i]] holds model i's features."""
+    return np.zeros((len(MODEL_NAMES), max(FEATURE_COUNTS)), dtype=np.float32)
+
+# Optional single-graph model built by merge_models.py: every model with its
+# scaler folded in, so /predict_all needs one session run instead of seven.
+# Models with the same columns read one shared "<first model>_features" input.
+MERGED_MODEL_FILE = "merged_models.onnx"
+MERGED_MODEL = None
+MERGED_INPUT_MODELS = [MODEL_NAMES[i] for i in sorted(set(FEATURE_SOURCES))]
+
+def _load_merged_model():
+    merged_path = os.path.join(BASE_DIR, MERGED_MODEL_FILE)
+    if not os.path.exists(merged_path):
+        return None
+    sources = [os.path.join(BASE_DIR, p) for paths in MODEL_ASSET_MAPPING.values() for p in paths.values()]
+    sources += [model_assets["onnx_path"] for model_assets in LOADED_MODELS.values()]
+    if any(os.path.getmtime(src) > os.path.getmtime(merged_path) for src in sources if os.path.exists(src)):
+        print(f"{MERGED_MODEL_FILE} is older than the model files; rerun merge_models.py. Using per-model sessions.")
+        return None
+
+    session = _create_session(merged_path)
+    if {i.name for i in session.get_inputs()} != {f"{name}_features" for name in MERGED_INPUT_MODELS}:
+        print(f"{MERGED_MODEL_FILE} does not match the loaded models; rerun merge_models.py. Using per-model sessions.")
+        return None
+
+    io_binding = session.io_binding()
+    inputs = {}
+    for model_name in MERGED_INPUT_MODELS:
+        n_features = len(LOADED_MODELS[model_name]["columns"])
+        inputs[model_name] = ort.OrtValue.ortvalue_from_numpy(np.zeros((1, n_features), dtype=np.float32))
+        io_binding.bind_ortvalue_input(f"{model_name}_features", inputs[model_name])
+    output_names = [output.name for output in session.get_outputs()]
+    output_models = [name[:-len("_prediction")] for name in output_names]
+    for name in output_names:
+        io_binding.bind_output(name, 'cpu')
+    output_buffers = _bind_output_buffers(session, io_binding, output_names)
+
+    return {
+        "session": session,
+        "io_binding": io_binding,
+        "inputs": inputs,
+        "output_models": output_models,
+        "output_buffers": output_buffers,
+        "io_lock": threading.Lock(),
+    }
+
+try:
+    MERGED_MODEL = _load_merged_model()
+    if MERGED_MODEL:
+        print(f"Using merged model {MERGED_MODEL_FILE} for /predict_all")
+except Exception as e:
+    print(f"Error loading {MERGED_MODEL_FILE}, using per-model sessions: {e}")
+
 
 # --- Feature Mapping and Engineering Function ---
-def create_feature_vector(input_data, columns):
+# Map new substation types to existing trained types for prediction
+SUBSTATION_TYPE_MAPPING = {
+    "Hybrid Substation": "GIS (Gas Insulated Substation)",
+    "Mobile Substation": "AIS (Air Insulated Substation)", 
+    "Switching Substation": "AIS (Air Insulated Substation)",
+    "Transformer Substation": "AIS (Air Insulated Substation)",
+    "Converter Substation": "HVDC (High Voltage Direct Current)"
+}
+
+# First run of digits in a tower type, e.g. "220" in "220 kV Lattice"
+_VOLTAGE_RE = re.compile(r'(\d+)')
+
+def create_feature_vector(input_data, model_assets, out=None):
     """
     Creates a feature vector for prediction based on client input, 
-    using the specific column list for the selected model.
+    using the precomputed column index of the selected model.
+    Returns a float32 array in the model's column order, written into
+    out when a buffer of that length is given.
     """
-    feature_vector = {col: 0.0 for col in columns}
+    col_index = model_assets["col_index"]
+    ohe_index = model_assets["ohe_index"]
+    if out is None:
+        feature_vector = np.zeros(len(col_index), dtype=np.float32)
+    else:
+        feature_vector = out
+        feature_vector.fill(0.0)
 
     try:
         # Numerical Features
         if "budget" in input_data:
-            if 'Estimated_Cost_Million' in feature_vector:
-                feature_vector['Estimated_Cost_Million'] = float(input_data["budget"]) / 1000000.0
+            idx = col_index.get('Estimated_Cost_Million')
+            if idx is not None:
+                feature_vector[idx] = float(input_data["budget"]) / 1000000.0
         
         # Handle voltage if it's provided separately or can be extracted
         if "voltage" in input_data:
-            if 'Voltage_kV' in feature_vector:
-                feature_vector['Voltage_kV'] = float(input_data["voltage"])
+            idx = col_index.get('Voltage_kV')
+            if idx is not None:
+                feature_vector[idx] = float(input_data["voltage"])
         elif "towerType" in input_data:
             # Try to extract voltage from towerType if it contains numbers
             tower_type = str(input_data["towerType"])
             try:
                 # Look for numbers in the tower type (e.g., "220 kV Lattice")
-                import re
-                voltage_match = re.search(r'(\d+)', tower_type)
-                if voltage_match and 'Voltage_kV' in feature_vector:
-                    feature_vector['Voltage_kV'] = float(voltage_match.group(1))
+                voltage_match = _VOLTAGE_RE.search(tower_type)
+                idx = col_index.get('Voltage_kV')
+                if voltage_match and idx is not None:
+                    feature_vector[idx] = float(voltage_match.group(1))
             except:
                 pass  # If voltage extraction fails, just skip it
         
     except (ValueError, IndexError) as e:
         raise ValueError(f"Required numeric data malformed: {e}")
         
-    # One-Hot Encoding (OHE) for categorical features with fallback key variants
-    def set_ohe(possible_keys):
-        for k in possible_keys:
-            if k in feature_vector:
-                feature_vector[k] = 1.0
-                return k
-        return None
-
-    matched_keys = []
+    # One-Hot Encoding (OHE) for categorical features: the normalized value is
+    # looked up once in that prefix's table, which covers the spacing/underscore
+    # variants found in the column names
+    def set_ohe(prefix, value):
+        idx = ohe_index[prefix].get(_normalize_ohe_value(value))
+        if idx is not None:
+            feature_vector[idx] = 1.0
 
     if "location" in input_data:
-        loc = str(input_data["location"]) 
-        candidates = [
-            f"Location_{loc}",
-            f"Location_ {loc}",
-            f"Location_ {loc} ",  # With trailing space
-            f"Location_{loc.replace(' ', '_')}",
-            f"Location_ {loc.replace(' ', '_')}",
-            f"Location_ {loc.replace(' ', '_')} ",  # With trailing space
-        ]
-        mk = set_ohe(candidates)
-        if mk: matched_keys.append(mk)
+        set_ohe("Location_", str(input_data["location"]))
     
     if "substationType" in input_data:
         sub = str(input_data["substationType"])
         
-        # Map new substation types to existing trained types for prediction
-        substation_mapping = {
-            "Hybrid Substation": "GIS (Gas Insulated Substation)",
-            "Mobile Substation": "AIS (Air Insulated Substation)", 
-            "Switching Substation": "AIS (Air Insulated Substation)",
-            "Transformer Substation": "AIS (Air Insulated Substation)",
-            "Converter Substation": "HVDC (High Voltage Direct Current)"
-        }
-        
         # Use mapped type if available, otherwise use original
-        mapped_sub = substation_mapping.get(sub, sub)
-        sub_norm = mapped_sub.replace(" (", "_(").replace(" ", "_")
-        
-        candidates = [
-            f"Substation_Type_{mapped_sub}",
-            f"Substation_Type_ {mapped_sub}",
-            f"Substation_Type_ {mapped_sub} ",  # With trailing space
-            f"Substation_Type_{sub_norm}",
-            f"Substation_Type_ {sub_norm}",
-            f"Substation_Type_ {sub_norm} ",  # With trailing space
-        ]
-        mk = set_ohe(candidates)
-        if mk: matched_keys.append(mk)
+        mapped_sub = SUBSTATION_TYPE_MAPPING.get(sub, sub)
+        set_ohe("Substation_Type_", mapped_sub)
 
     if "towerType" in input_data:
-        tower = str(input_data["towerType"]) 
-        candidates = [
-            f"Circuit_Type_{tower}",
-            f"Circuit_Type_ {tower}",
-            f"Circuit_Type_ {tower} ",  # With trailing space
-            f"Circuit_Type_{tower.replace(' ', '_')}",
-            f"Circuit_Type_ {tower.replace(' ', '_')}",
-            f"Circuit_Type_ {tower.replace(' ', '_')} ",  # With trailing space
-        ]
-        mk = set_ohe(candidates)
-        if mk: matched_keys.append(mk)
+        set_ohe("Circuit_Type_", str(input_data["towerType"]))
 
     if "geo" in input_data:
-        geo = str(input_data["geo"]) 
-        candidates = [
-            f"Geographical_Zone_{geo}",
-            f"Geographical_Zone_ {geo}",
-            f"Geographical_Zone_ {geo} ",  # With trailing space
-            f"Geographical_Zone_{geo.replace(' ', '_')}",
-            f"Geographical_Zone_ {geo.replace(' ', '_')}",
-            f"Geographical_Zone_ {geo.replace(' ', '_')} ",  # With trailing space
-        ]
-        mk = set_ohe(candidates)
-        if mk: matched_keys.append(mk)
+        set_ohe("Geographical_Zone_", str(input_data["geo"]))
 
     if "taxes" in input_data:
-        taxes = str(input_data["taxes"]) 
-        candidates = [
-            f"Taxes_Applicable_{taxes}",
-            f"Taxes_Applicable_ {taxes}",
-            f"Taxes_Applicable_ {taxes} ",  # With trailing space
-            f"Taxes_Applicable_{taxes.replace(' ', '_')}",
-            f"Taxes_Applicable_ {taxes.replace(' ', '_')}",
-            f"Taxes_Applicable_ {taxes.replace(' ', '_')} ",  # With trailing space
-        ]
-        mk = set_ohe(candidates)
-        if mk: matched_keys.append(mk)
-        
-    final_features = [feature_vector[col] for col in columns]
+        set_ohe("Taxes_Applicable_", str(input_data["taxes"]))
     
+    if logger.isEnabledFor(logging.DEBUG):
+        # Matched one-hot columns are read back from the vector only when debugging
+        ohe_columns = {idx for table in ohe_index.values() for idx in table.values()}
+        matched_keys = [model_assets["columns"][idx] for idx in np.flatnonzero(feature_vector) if idx in ohe_columns]
+        logger.debug("FEATURE_DEBUG | matched_keys=%s", matched_keys)
+
+    return feature_vector
+
+# The input fields create_feature_vector reads
+FEATURE_INPUT_FIELDS = ("budget", "voltage", "towerType", "location", "substationType", "geo", "taxes")
+
+@lru_cache(maxsize=4096)
+def _cached_feature_vector(model_id, field_items):
+    input_data = {field: value for field, _, value in field_items}
+    feature_vector = create_feature_vector(input_data, MODEL_ASSETS[model_id])
+    feature_vector.flags.writeable = False
+    return feature_vector
+
+def build_feature_vector(input_data, model_id, out):
+    """
+    create_feature_vector for model model_id into out, memoized on the input's
+    feature fields so repeated inputs skip parsing and one-hot lookups.
+    """
+    # The value's type is part of the key: True and 1 hash equal but encode differently
+    field_items = tuple((field, type(input_data[field]), input_data[field])
+                        for field in FEATURE_INPUT_FIELDS if field in input_data)
     try:
-        print("FEATURE_DEBUG | matched_keys=", matched_keys)
-    except Exception:
-        pass
+        hash(field_items)
+    except TypeError:
+        # Lists and other unhashable values are built uncached
+        return create_feature_vector(input_data, MODEL_ASSETS[model_id], out=out)
+    np.copyto(out, _cached_feature_vector(model_id, field_items))
+    return out
+
+def run_model(model_assets, feature_vector):
+    """
+    Scales a feature vector from create_feature_vector in place and runs it
+    through the model's bound session. Returns the prediction as a float.
+    """
+    input_array = feature_vector.reshape(1, -1)
+    n_expected = len(model_assets["mean"])
+    if input_array.shape[1] != n_expected:
+        raise ValueError(f"X has {input_array.shape[1]} features, but {model_assets['scaler_type']} "
+                         f"is expecting {n_expected} features as input.")
+    np.subtract(input_array, model_assets["mean"], out=input_array)
+    np.multiply(input_array, model_assets["inv_scale"], out=input_array)
+    return run_scaled(model_assets, input_array)
+
+def run_model_batch(model_assets, features, out=None):
+    """
+    Scales a (rows, n_features) matrix of feature vectors in place and runs
+    it through the model in one session call. Returns one float per row.
+    With out (a float32 buffer of the same shape), features is left untouched
+    and scaled into out instead.
+    """
+    n_expected = len(model_assets["mean"])
+    if features.shape[1] != n_expected:
+        raise ValueError(f"X has {features.shape[1]} features, but {model_assets['scaler_type']} "
+                         f"is expecting {n_expected} features as input.")
+    if out is not None:
+        np.copyto(out, features)
+        features = out
+    if not model_assets["batchable"]:
+        return [run_model(model_assets, row) for row in features]
+    np.subtract(features, model_assets["mean"], out=features)
+    np.multiply(features, model_assets["inv_scale"], out=features)
+    prediction = model_assets["session"].run(
+        [model_assets["output_name"]], {model_assets["input_name"]: features}
+    )[0]
+    return prediction.reshape(len(features), -1)[:, 0].tolist()
+
+def run_scaled(model_assets, scaled_features):
+    """Runs an already scaled feature vector through the model's bound session."""
+    with model_assets["io_lock"]:
+        model_assets["input_ortvalue"].update_inplace(scaled_features.reshape(1, -1))
+        model_assets["session"].run_with_iobinding(model_assets["io_binding"])
+        return float(model_assets["output_buffer"].flat[0])
+
+def run_merged_model(input_data, scratch):
+    """
+    Predicts with every model in one run of the merged graph. Models whose
+    feature vector cannot be built are reported as "Prediction Error".
+    """
+    predictions = {}
+    with MERGED_MODEL["io_lock"]:
+        feature_errors = {}
+        for i, model_name in enumerate(MODEL_NAMES):
+            source = FEATURE_SOURCES[i]
+            if source != i:
+                # Reads the shared input of the first model with its columns
+                if source in feature_errors:
+                    print(f"Error predicting for {model_name}: {feature_errors[source]}")
+                    predictions[model_name] = "Prediction Error"
+                continue
+            features = scratch[i, :FEATURE_COUNTS[i]]
+            try:
+                build_feature_vector(input_data, i, out=features)
+            except Exception as e:
+                print(f"Error predicting for {model_name}: {e}")
+                predictions[model_name] = "Prediction Error"
+                feature_errors[i] = e
+                features.fill(0.0)
+            MERGED_MODEL["inputs"][model_name].update_inplace(features.reshape(1, -1))
+
+        MERGED_MODEL["session"].run_with_iobinding(MERGED_MODEL["io_binding"])
+        for model_name, output in zip(MERGED_MODEL["output_models"], MERGED_MODEL["output_buffers"]):
+            predictions.setdefault(model_name, float(output.flat[0]))
+    return {model_name: predictions[model_name] for model_name in MODEL_NAMES}
+
+def predict_one(input_data, scratch=None):
+    """
+    Returns predictions from all models for one input, with "Prediction Error"
+    for any model that fails. scratch is an optional buffer from
+    new_feature_scratch() that the caller does not share between threads.
+    """
+    if scratch is None:
+        scratch = new_feature_scratch()
+    if MERGED_MODEL is not None:
+        return run_merged_model(input_data, scratch)
+
+    all_predictions = {}
+    feature_errors = {}
+    
+    for i, model_name in enumerate(MODEL_NAMES):
+        source = FEATURE_SOURCES[i]
+        try:
+            if source in feature_errors:
+                raise feature_errors[source]
+            if source != i:
+                # Same columns as an earlier model: reuse its unscaled row
+                scratch[i] = scratch[source]
+                continue
+            features_ordered = build_feature_vector(input_data, i, out=scratch[i, :FEATURE_COUNTS[i]])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("PREDICT_DEBUG | model=%s nonzero_count=%d", model_name, np.count_nonzero(features_ordered))
+        except Exception as e:
+            print(f"Error predicting for {model_name}: {e}")
+            all_predictions[model_name] = "Prediction Error" # Report the error to the user
+            feature_errors.setdefault(i, e)
+            scratch[i].fill(0.0)
+
+    # Scale every model's row at once; padding columns stay 0
+    np.subtract(scratch, MEANS_MATRIX, out=scratch)
+    np.multiply(scratch, INV_SCALE_MATRIX, out=scratch)
+
+    for i, model_name in enumerate(MODEL_NAMES):
+        if model_name in all_predictions:
+            continue
+        try:
+            all_predictions[model_name] = run_scaled(MODEL_ASSETS[i], scratch[i, :FEATURE_COUNTS[i]])
+        except Exception as e:
+            print(f"Error predicting for {model_name}: {e}")
+            all_predictions[model_name] = "Prediction Error"
+
+    return {model_name: all_predictions[model_name] for model_name in MODEL_NAMES}
+
+def predict_many(inputs, scratch=None):
+    """
+    Same as predict_one for several inputs, running each model once over all
+    of them. Returns one predictions dict per input, in order.
+    """
+    if len(inputs) == 1:
+        return [predict_one(inputs[0], scratch)]
+
+    results = [{} for _ in inputs]
+    # Unscaled features and per-row build errors of models that others share
+    shared_features = {}
+    for i, model_name in enumerate(MODEL_NAMES):
+        model_assets = MODEL_ASSETS[i]
+        source = FEATURE_SOURCES[i]
+        if source in shared_features:
+            source_features, row_errors = shared_features[source]
+            features = source_features.copy()
+            for row, e in row_errors.items():
+                print(f"Error predicting for {model_name}: {e}")
+                results[row][model_name] = "Prediction Error"
+        else:
+            features = np.zeros((len(inputs), FEATURE_COUNTS[i]), dtype=np.float32)
+            row_errors = {}
+            for row, input_data in enumerate(inputs):
+                try:
+                    build_feature_vector(input_data, i, out=features[row])
+                except Exception as e:
+                    print(f"Error predicting for {model_name}: {e}")
+                    results[row][model_name] = "Prediction Error"
+                    row_errors[row] = e
+                    features[row] = 0.0
+            if FEATURE_SOURCES.count(i) > 1:
+                shared_features[i] = (features.copy(), row_errors)
+
+        try:
+            if model_assets["batchable"]:
+                np.subtract(features, MEANS[i], out=features)
+                np.multiply(features, INV_SCALES[i], out=features)
+                prediction = SESSIONS[i].run(OUTPUT_NAMES[i], {INPUT_NAMES[i]: features})[0].reshape(len(inputs), -1)[:, 0]
+            else:
+                prediction = [run_model(model_assets, row_features) for row_features in features]
+            for row, result in enumerate(results):
+                result.setdefault(model_name, float(prediction[row]))
+        except Exception as e:
+            print(f"Error predicting for {model_name}: {e}")
+            for result in results:
+                result.setdefault(model_name, "Prediction Error")
+    return results
+
+# Concurrent /predict_all requests are coalesced: whatever queues up while the
+# worker is busy is predicted together, one session run per model.
+PREDICT_BATCH_MAX = 32
+# Optional wait after the first queued request for more to join its batch;
+# 0 dispatches as soon as the worker is free
+PREDICT_BATCH_WINDOW = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "0")) / 1000.0
+# Longest a request waits for its prediction before failing
+PREDICT_TIMEOUT = 30.0
+
+class PredictionBatcher:
+    """Runs predictions on one worker thread, batching requests that arrive together."""
+
+    def __init__(self, max_batch=PREDICT_BATCH_MAX, window=PREDICT_BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.window = window
+        self.pending = queue.Queue()
+        self.worker = None
+        self.start_lock = threading.Lock()
+        # Only the worker thread builds features, so it can reuse one buffer
+        self.scratch = new_feature_scratch()
+
+    def predict(self, input_data):
+        if self.worker is None:
+            with self.start_lock:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self._run, daemon=True, name="prediction-batcher")
+                    self.worker.start()
+        future = Future()
+        self.pending.put((input_data, future))
+        try:
+            return future.result(timeout=PREDICT_TIMEOUT)
+        except FutureTimeoutError:
+            # Still queued: cancel so the worker skips it
+            future.cancel()
+            raise
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            # Requests that already timed out are dropped
+            batch = [(input_data, future) for input_data, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = predict_many([input_data for input_data, _ in batch], self.scratch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
 
-    return final_features
+PREDICTION_BATCHER = PredictionBatcher()
 
 @app.route("/predict_all", methods=["POST"])
 def predict_all():
@@ -238,33 +775,7 @@ def predict_all():
         if not input_features:
             return jsonify({"error": "Missing 'input_features' in JSON payload."}), 400
 
-        all_predictions = {}
-        
-        for model_name, model_assets in LOADED_MODELS.items():
-            try:
-                features_ordered = create_feature_vector(input_features, model_assets["columns"])
-            
-                input_array = np.array(features_ordered, dtype=np.float32).reshape(1, -1)
-                scaled_input = model_assets["scaler"].transform(input_array)
-                
-                prediction = model_assets["session"].run(
-                    [model_assets["output_name"]], 
-                    {model_assets["input_name"]: scaled_input}
-                )
-                prediction_result = float(prediction[0].flatten()[0])
-                
-                all_predictions[model_name] = prediction_result
-                try:
-                    nonzero = [i for i,v in enumerate(features_ordered) if v != 0.0]
-                    print(f"PREDICT_DEBUG | model={model_name} nonzero_count={len(nonzero)}")
-                except Exception:
-                    pass
-            
-            except Exception as e:
-                print(f"Error predicting for {model_name}: {e}")
-                all_predictions[model_name] = "Prediction Error" # Report the error to the user
-
-        return jsonify(all_predictions) 
+        return jsonify(PREDICTION_BATCHER.predict(input_features))
 
     except ValueError as e:
         return jsonify({"error": f"Input data error: {str(e)}"}), 400
@@ -294,6 +805,8 @@ MATERIAL_DEFAULTS = {
     'reactors': 75,
     'tower': 75,
 }
+# Materials scheduled when a request does not list any (never mutated)
+DEFAULT_SCHEDULE_MATERIALS = list(MATERIAL_DEFAULTS)
 
 # --- Periodic Forecasting Database ---
 import sqlite3
@@ -301,16 +814,188 @@ from datetime import datetime, timedelta
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forecast.db')
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+# Connections are shared process-wide; idle ones wait in this pool. At most
+# DB_POOL_SIZE are open at once: a checkout beyond that waits up to
+# DB_POOL_TIMEOUT seconds for another to be released.
+DB_POOL_SIZE = 10
+DB_POOL_TIMEOUT = 30.0
+_db_pool = queue.Queue(maxsize=DB_POOL_SIZE)
+_db_pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+
+class PooledConnection(sqlite3.Connection):
+    """Connection handed out by get_db_connection.
+
+    close() rolls back any open transaction (as closing a real connection
+    would) and returns the connection to the pool, so its statement cache
+    stays warm. Calling it again is a no-op. checkout identifies the current
+    checkout (None while pooled), so a release can tell whether the
+    connection has been handed to someone else since.
+    """
+    checkout = None
+
+    def close(self):
+        if self.checkout is None:
+            return
+        if self.in_transaction:
+            self.rollback()
+        self.checkout = None
+        try:
+            _db_pool.put_nowait(self)
+        except queue.Full:
+            sqlite3.Connection.close(self)
+        _db_pool_slots.release()
+
+# Prepared statements cached per connection (sqlite3 defaults to 128)
+STATEMENT_CACHE_SIZE = 256
+
+def _new_db_connection():
+    # Pooled connections live for the whole process, so their statement cache
+    # is sized to hold every distinct statement the app runs
+    conn = sqlite3.connect(DB_PATH, timeout=30.0, factory=PooledConnection, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
     # Enable WAL mode for better concurrent access
     conn.execute('PRAGMA journal_mode=WAL;')
+    # In WAL mode NORMAL only syncs at checkpoints and stays corruption-safe
+    conn.execute('PRAGMA synchronous=NORMAL;')
     # Set busy timeout to handle locks
     conn.execute('PRAGMA busy_timeout=30000;')
+    # Sort/temp b-trees in memory, a 16 MB page cache per pooled connection and
+    # reads served from a shared memory map of the file
+    conn.execute('PRAGMA temp_store=MEMORY;')
+    conn.execute('PRAGMA cache_size=-16384;')
+    conn.execute('PRAGMA mmap_size=268435456;')
+    # Large sorts (ORDER BY / GROUP BY without an index) may use helper threads
+    conn.execute('PRAGMA threads=4;')
+    return conn
+
+def get_db_connection():
+    """
+    Checks a connection out of the pool (opening one if none is idle), waiting
+    while DB_POOL_SIZE are already checked out. Callers release it with
+    conn.close(); inside a request anything still checked out is released when
+    the app context tears down.
+    """
+    if not _db_pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise sqlite3.OperationalError(f"No database connection was released within {DB_POOL_TIMEOUT:g}s")
+    try:
+        conn = _db_pool.get_nowait()
+    except queue.Empty:
+        try:
+            conn = _new_db_connection()
+        except Exception:
+            _db_pool_slots.release()
+            raise
+    conn.checkout = object()
+    if has_request_context():
+        g.setdefault('db_connections', []).append((conn, conn.checkout))
     return conn
 
+def close_db_pool():
+    """Closes the idle pooled connections; the last one to close checkpoints the WAL."""
+    while True:
+        try:
+            conn = _db_pool.get_nowait()
+        except queue.Empty:
+            return
+        sqlite3.Connection.close(conn)
+
+atexit.register(close_db_pool)
+
+@app.teardown_appcontext
+def release_db_connections(exc):
+    # Handlers that return early can skip conn.close(). Connections the handler
+    # already closed may since be checked out by another thread; only those
+    # still on this request's checkout are released.
+    for conn, checkout in g.pop('db_connections', []):
+        if conn.checkout is checkout:
+            conn.close()
+
+# Rows are pulled from the cursor this many at a time while streaming
+STREAM_FETCH_SIZE = 500
+
+def json_rows_chunks(key, cur, to_dict):
+    """Yields {key: [to_dict(row), ...]} as JSON text chunks, reading cur in batches.
+
+    With key=None the bare list is written instead.
+    """
+    yield '[' if key is None else f'{{"{key}":['
+    first = True
+    while rows := cur.fetchmany(STREAM_FETCH_SIZE):
+        for row in rows:
+            yield ('' if first else ',') + app.json.dumps(to_dict(row))
+            first = False
+    yield ']' if key is None else ']}'
+
+def stream_json_rows(key, cur, to_dict):
+    """Stream {key: [to_dict(row), ...]} (or the bare list for key=None) as JSON
+    while reading cur in batches.
+
+    The request context stays up until the last row has been written, so the
+    cursor's connection is released once, by the request teardown.
+    """
+    return Response(stream_with_context(json_rows_chunks(key, cur, to_dict)), mimetype='application/json')
+
+def listing_etag(cur, fingerprint_sql, params=()):
+    """ETag for a listing, hashed from a cheap query over the rows it is built from."""
+    cur.execute(fingerprint_sql, params)
+    return hashlib.sha1(repr(tuple(cur.fetchone())).encode()).hexdigest()
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
 # --- Dynamic threshold helpers (per project/material) ---
+# An existing active alert for the material/project is updated in place
+# (ux_reorder_alerts_active keeps at most one active alert per pair)
+ALERT_UPSERT_CONFLICT = """
+    ON CONFLICT(material_id, project_id) WHERE status = 'active' DO UPDATE SET
+        alert_type = excluded.alert_type,
+        current_stock = excluded.current_stock,
+        reorder_point = excluded.reorder_point,
+        suggested_order_quantity = excluded.suggested_order_quantity,
+        priority = excluded.priority,
+        created_at = excluded.created_at
+"""
+# Creates the active alert for a material/project, or updates it in place
+SQL_UPSERT_ACTIVE_ALERT = f"""
+    INSERT INTO reorder_alerts
+    (material_id, project_id, alert_type, current_stock, reorder_point,
+     suggested_order_quantity, priority, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?)
+    {ALERT_UPSERT_CONFLICT}
+"""
+
+# Positive usage of one material on one project, summed per day with entries
+SQL_PROJECT_USAGE_STATS = """
+    SELECT AVG(used_sum), SUM(used_sum), SUM(used_entries)
+    FROM material_usage_daily
+    WHERE material_id = ? AND project_id = ?
+"""
+
+# Net usage of one material on one project (reservations included) together
+# with the SQL_PROJECT_USAGE_STATS figures, from a single pass over its days
+SQL_PROJECT_USAGE_TOTALS = """
+    SELECT COALESCE(SUM(quantity_sum), 0), AVG(used_sum), SUM(used_sum), SUM(used_entries)
+    FROM material_usage_daily
+    WHERE material_id = ? AND project_id = ?
+"""
+
+def usage_threshold(avg_daily: float, lead_days: int, safety_buffer_ratio: float = 0.10) -> float:
+    """Dynamic threshold = avgDaily(on days with entries) * (leadDays + 3) * (1 + buffer)."""
+    # Add 3-day safety in lead time as discussed, then multiply by 1 + buffer
+    effective_days = max(lead_days + 3, 0)
+    threshold = avg_daily * float(effective_days)
+    threshold *= (1.0 + float(safety_buffer_ratio))
+    return float(threshold)
+
+def project_usage_stats(cur, material_id: int, project_id: int):
+    """Returns (average used per day with entries, average used per positive entry) from one query."""
+    avg_per_day, total_used, num_entries = cur.execute(SQL_PROJECT_USAGE_STATS, (material_id, project_id)).fetchone()
+    avg_per_entry = float(total_used or 0) / num_entries if num_entries else 0.0
+    return float(avg_per_day or 0), avg_per_entry
+
 def compute_project_threshold(cur, material_id: int, project_id: int, lookback_days: int = 30, safety_buffer_ratio: float = 0.10) -> float:
     """Compute dynamic threshold = avgDaily(on days with entries) * (leadDays + 3) * (1 + buffer)."""
     if not project_id:
@@ -318,18 +1003,7 @@ def compute_project_threshold(cur, material_id: int, project_id: int, lookback_d
 
     try:
         # Average of per-day totals over days that actually have usage entries
-        cur.execute(
-            """
-                SELECT AVG(daily_used) FROM (
-                    SELECT DATE(usage_date) as usage_day, SUM(CASE WHEN quantity_used > 0 THEN quantity_used ELSE 0 END) as daily_used
-                    FROM material_usage 
-                    WHERE material_id = ? AND project_id = ?
-                    GROUP BY DATE(usage_date)
-                )
-            """,
-            (material_id, project_id)
-        )
-        avg_daily = float(cur.fetchone()[0] or 0)
+        avg_daily, _ = project_usage_stats(cur, material_id, project_id)
 
         # Resolve lead time days from defaults
         # Map material_id -> material name to look up defaults by name key
@@ -337,12 +1011,7 @@ def compute_project_threshold(cur, material_id: int, project_id: int, lookback_d
         name_row = cur.fetchone()
         material_name = str(name_row[0]).lower() if name_row and name_row[0] else ''
         lead_days = int(MATERIAL_DEFAULTS.get(material_name, 90))
-
-        # Add 3-day safety in lead time as discussed, then multiply by 1 + buffer
-        effective_days = max(lead_days + 3, 0)
-        threshold = avg_daily * float(effective_days)
-        threshold *= (1.0 + float(safety_buffer_ratio))
-        return float(threshold)
+        return usage_threshold(avg_daily, lead_days, safety_buffer_ratio)
     except Exception:
         return 0.0
 
@@ -351,25 +1020,34 @@ def compute_project_avg_daily(cur, material_id: int, project_id: int, lookback_d
     try:
         if not project_id:
             return 0.0
-        cur.execute(
-            """
-                SELECT COALESCE(SUM(CASE WHEN quantity_used > 0 THEN quantity_used ELSE 0 END), 0),
-                       COALESCE(COUNT(CASE WHEN quantity_used > 0 THEN 1 END), 0)
-                FROM material_usage
-                WHERE material_id = ? AND project_id = ?
-            """,
-            (material_id, project_id)
-        )
-        total_used, num_entries = cur.fetchone() or (0, 0)
-        total_used = float(total_used or 0)
-        num_entries = int(num_entries or 0)
-        return (total_used / num_entries) if num_entries > 0 else 0.0
+        _, avg_per_entry = project_usage_stats(cur, material_id, project_id)
+        return avg_per_entry
     except Exception:
         return 0.0
 
+# Bump whenever init_periodic_db gains new tables, columns or indexes
+SCHEMA_VERSION = 14
+
+def _add_missing_columns(cur, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, type) not yet in table (for existing databases)."""
+    existing = {row[1] for row in cur.execute(f'PRAGMA table_info({table})')}
+    for name, column_type in columns:
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
 def init_periodic_db():
     conn = get_db_connection()
     cur = conn.cursor()
+
+    # The whole migration is one write transaction; taking the lock up front also
+    # keeps two processes starting together from migrating at the same time
+    cur.execute('BEGIN IMMEDIATE')
+
+    # Databases already migrated to this schema version need no DDL at all
+    if cur.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        conn.rollback()
+        conn.close()
+        return
     
     # Users table for authentication
     cur.execute("""
@@ -387,22 +1065,8 @@ def init_periodic_db():
         )
     """)
     
-    # Add fullname and state columns if they don't exist (for existing databases)
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN fullname TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN state TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # Add admin_level column for differentiating state vs central admin
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN admin_level TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Add fullname, state and admin_level (state vs central admin) columns if they don't exist
+    _add_missing_columns(cur, 'users', [('fullname', 'TEXT'), ('state', 'TEXT'), ('admin_level', 'TEXT')])
     
     # Projects table for role-based project sharing
     cur.execute("""
@@ -434,95 +1098,64 @@ def init_periodic_db():
         )
     """)
     
-    # Add approval columns if they don't exist (for existing databases)
-    try:
-        cur.execute("ALTER TABLE projects ADD COLUMN approved_by INTEGER")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cur.execute("ALTER TABLE projects ADD COLUMN approval_date TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cur.execute("ALTER TABLE projects ADD COLUMN approval_notes TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Add approval columns if they don't exist
+    _add_missing_columns(cur, 'projects', [('approved_by', 'INTEGER'), ('approval_date', 'TEXT'), ('approval_notes', 'TEXT')])
     
-    # Fix CHECK constraint for status column (SQLite workaround)
-    # Check if we need to update the constraint by testing if 'rejected' is allowed
-    try:
-        # Try to insert a test record with 'rejected' status using the same connection
+    # Fix CHECK constraint for status column (SQLite workaround): rebuild the
+    # table only if its stored definition predates the 'rejected' status
+    row = cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'projects'").fetchone()
+    if row and "'rejected'" not in row[0]:
+        print("Updating database schema to support 'rejected' status...")
+        
+        # Create backup table
+        cur.execute("""
+            CREATE TABLE projects_backup AS 
+            SELECT * FROM projects
+        """)
+        
+        # Drop original table
+        cur.execute("DROP TABLE projects")
+        
+        # Recreate with updated constraint
+        cur.execute("""
+            CREATE TABLE projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                budget TEXT NOT NULL,
+                location TEXT NOT NULL,
+                tower_type TEXT NOT NULL,
+                substation_type TEXT NOT NULL,
+                geo TEXT NOT NULL,
+                taxes TEXT NOT NULL,
+                created_by_user_id INTEGER NOT NULL,
+                created_by_username TEXT NOT NULL,
+                created_by_role TEXT NOT NULL,
+                status TEXT NOT NULL CHECK (status IN ('pending', 'approved', 'declined', 'deleted', 'finished', 'rejected')),
+                steel_forecast REAL,
+                conductor_forecast REAL,
+                transformers_forecast REAL,
+                earthwire_forecast REAL,
+                foundation_forecast REAL,
+                reactors_forecast REAL,
+                tower_forecast REAL,
+                created_at TEXT NOT NULL,
+                approved_by INTEGER,
+                approval_date TEXT,
+                approval_notes TEXT,
+                FOREIGN KEY(created_by_user_id) REFERENCES users(id),
+                FOREIGN KEY(approved_by) REFERENCES users(id)
+            )
+        """)
+        
+        # Restore data
         cur.execute("""
             INSERT INTO projects 
-            (budget, location, tower_type, substation_type, geo, taxes, 
-             created_by_user_id, created_by_username, created_by_role, status, created_at)
-            VALUES ('test', 'test', 'test', 'test', 'test', 'test', 999999, 'test', 'admin', 'rejected', ?)
-        """, (datetime.now().isoformat(),))
-        # If successful, delete the test record
-        cur.execute("DELETE FROM projects WHERE created_by_user_id = 999999")
-        conn.commit()
-    except sqlite3.IntegrityError as e:
-        if "CHECK constraint failed" in str(e):
-            # Need to recreate the table with updated constraint
-            print("Updating database schema to support 'rejected' status...")
-            
-            # Rollback the failed transaction
-            conn.rollback()
-            
-            # Create backup table
-            cur.execute("""
-                CREATE TABLE projects_backup AS 
-                SELECT * FROM projects
-            """)
-            
-            # Drop original table
-            cur.execute("DROP TABLE projects")
-            
-            # Recreate with updated constraint
-            cur.execute("""
-                CREATE TABLE projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    budget TEXT NOT NULL,
-                    location TEXT NOT NULL,
-                    tower_type TEXT NOT NULL,
-                    substation_type TEXT NOT NULL,
-                    geo TEXT NOT NULL,
-                    taxes TEXT NOT NULL,
-                    created_by_user_id INTEGER NOT NULL,
-                    created_by_username TEXT NOT NULL,
-                    created_by_role TEXT NOT NULL,
-                    status TEXT NOT NULL CHECK (status IN ('pending', 'approved', 'declined', 'deleted', 'finished', 'rejected')),
-                    steel_forecast REAL,
-                    conductor_forecast REAL,
-                    transformers_forecast REAL,
-                    earthwire_forecast REAL,
-                    foundation_forecast REAL,
-                    reactors_forecast REAL,
-                    tower_forecast REAL,
-                    created_at TEXT NOT NULL,
-                    approved_by INTEGER,
-                    approval_date TEXT,
-                    approval_notes TEXT,
-                    FOREIGN KEY(created_by_user_id) REFERENCES users(id),
-                    FOREIGN KEY(approved_by) REFERENCES users(id)
-                )
-            """)
-            
-            # Restore data
-            cur.execute("""
-                INSERT INTO projects 
-                SELECT * FROM projects_backup
-            """)
-            
-            # Drop backup table
-            cur.execute("DROP TABLE projects_backup")
-            
-            print("Database schema updated successfully!")
-    except Exception as e:
-        # Other error, rollback
-        conn.rollback()
+            SELECT * FROM projects_backup
+        """)
+        
+        # Drop backup table
+        cur.execute("DROP TABLE projects_backup")
+        
+        print("Database schema updated successfully!")
     
     # Project phases table
     cur.execute("""
@@ -750,6 +1383,142 @@ def init_periodic_db():
         )
     """)
 
+    # Indexes for the per-state project listings (projects joined to their
+    # creator, filtered by state/status, newest first), forecast history and phases
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_state ON users(state)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_creator_status_created ON projects(created_by_user_id, status, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects(status, created_at DESC)")
+    # State admins list projects by location IN (<the state's cities>)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_location_created ON projects(location, created_at DESC)")
+    # Pending projects are a small slice of the table; the approval queue reads only those
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_pending ON projects(created_by_user_id, created_at DESC) WHERE status = 'pending'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_forecast_history_project_date ON forecast_history(project_id, forecast_date DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_project_phases_project ON project_phases(project_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_forecast_schedules_project ON forecast_schedules(project_id)")
+    # Due active schedules (is_active = 1 AND next_run <= today); YYYY-MM-DD strings sort by date
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_forecast_schedules_due ON forecast_schedules(next_run) WHERE is_active = 1")
+    # Per material/project usage by date; with quantity_used included the recent
+    # usage check in check_inventory_alerts is answered from the index alone.
+    # It replaces the same index without quantity_used.
+    cur.execute("DROP INDEX IF EXISTS idx_material_usage_material_project_date")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_material_usage_material_project_date_qty ON material_usage(material_id, project_id, usage_date, quantity_used)")
+    # Per material/project delivery counts and totals, answered from the index alone
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_material_deliveries_material_project ON material_deliveries(material_id, project_id, quantity_delivered)")
+    # One active alert per material/project, the target of SQL_UPSERT_ACTIVE_ALERT.
+    # Older databases may hold duplicates; all but the oldest are resolved first.
+    cur.execute("""
+        UPDATE reorder_alerts SET status = 'resolved', resolved_at = ?
+        WHERE status = 'active' AND project_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM reorder_alerts
+            WHERE status = 'active' AND project_id IS NOT NULL
+            GROUP BY material_id, project_id
+        )
+    """, (datetime.now().isoformat(),))
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_reorder_alerts_active ON reorder_alerts(material_id, project_id) WHERE status = 'active'")
+    # A project's active alerts (/inventory/alerts?project_id=)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reorder_alerts_active_project ON reorder_alerts(project_id) WHERE status = 'active'")
+
+    # Deleting a project removes its phases, schedules and forecast history in
+    # the same statement (the child tables have no foreign key to projects)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_projects_delete_children
+        AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM project_phases WHERE project_id = OLD.id;
+            DELETE FROM forecast_schedules WHERE project_id = OLD.id;
+            DELETE FROM forecast_history WHERE project_id = OLD.id;
+        END
+    """)
+
+    # Usage rolled up per material/project/day: net quantity (reservations
+    # included) and the positive usage and entry count behind the thresholds.
+    # material_usage is append-only, so an insert trigger keeps it current;
+    # a newly created rollup is filled from the rows already logged.
+    has_usage_daily = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'material_usage_daily'").fetchone()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS material_usage_daily (
+            material_id INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            usage_day TEXT,
+            quantity_sum DECIMAL(10,2) NOT NULL DEFAULT 0,
+            used_sum DECIMAL(10,2) NOT NULL DEFAULT 0,
+            used_entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(material_id, project_id, usage_day)
+        )
+    """)
+    if not has_usage_daily:
+        cur.execute("""
+            INSERT INTO material_usage_daily (material_id, project_id, usage_day, quantity_sum, used_sum, used_entries)
+            SELECT material_id, project_id, DATE(usage_date), SUM(quantity_used),
+                   SUM(CASE WHEN quantity_used > 0 THEN quantity_used ELSE 0 END),
+                   COUNT(CASE WHEN quantity_used > 0 THEN 1 END)
+            FROM material_usage
+            GROUP BY material_id, project_id, DATE(usage_date)
+        """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_material_usage_daily
+        AFTER INSERT ON material_usage
+        BEGIN
+            INSERT INTO material_usage_daily (material_id, project_id, usage_day, quantity_sum, used_sum, used_entries)
+            VALUES (NEW.material_id, NEW.project_id, DATE(NEW.usage_date), NEW.quantity_used,
+                    CASE WHEN NEW.quantity_used > 0 THEN NEW.quantity_used ELSE 0 END,
+                    CASE WHEN NEW.quantity_used > 0 THEN 1 ELSE 0 END)
+            ON CONFLICT(material_id, project_id, usage_day) DO UPDATE SET
+                quantity_sum = quantity_sum + excluded.quantity_sum,
+                used_sum = used_sum + excluded.used_sum,
+                used_entries = used_entries + excluded.used_entries;
+        END
+    """)
+
+    # Per project/material stock (deliveries to the project less its usage) and
+    # delivery count, kept current by insert triggers on both append-only logs
+    # so the alert check reads the stock instead of summing both tables
+    has_inventory_project = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'inventory_project'").fetchone()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_project (
+            material_id INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            current_stock DECIMAL(10,2) NOT NULL DEFAULT 0,
+            delivery_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(material_id, project_id)
+        )
+    """)
+    if not has_inventory_project:
+        cur.execute("""
+            INSERT INTO inventory_project (material_id, project_id, current_stock, delivery_count)
+            SELECT material_id, project_id, SUM(quantity), SUM(deliveries) FROM (
+                SELECT material_id, project_id, quantity_delivered AS quantity, 1 AS deliveries
+                FROM material_deliveries WHERE project_id IS NOT NULL
+                UNION ALL
+                SELECT material_id, project_id, -quantity_used, 0 FROM material_usage
+            )
+            GROUP BY material_id, project_id
+        """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_project_delivery
+        AFTER INSERT ON material_deliveries
+        WHEN NEW.project_id IS NOT NULL
+        BEGIN
+            INSERT INTO inventory_project (material_id, project_id, current_stock, delivery_count)
+            VALUES (NEW.material_id, NEW.project_id, NEW.quantity_delivered, 1)
+            ON CONFLICT(material_id, project_id) DO UPDATE SET
+                current_stock = current_stock + excluded.current_stock,
+                delivery_count = delivery_count + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_project_usage
+        AFTER INSERT ON material_usage
+        BEGIN
+            INSERT INTO inventory_project (material_id, project_id, current_stock)
+            VALUES (NEW.material_id, NEW.project_id, -NEW.quantity_used)
+            ON CONFLICT(material_id, project_id) DO UPDATE SET
+                current_stock = current_stock - NEW.quantity_used;
+        END
+    """)
+
     # Initialize default materials based on our forecasting models
     current_time = datetime.now().isoformat()
     try:
@@ -775,26 +1544,52 @@ def init_periodic_db():
     except Exception as e:
         print(f"Warning: Could not initialize default materials: {e}")
     
+    cur.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     conn.commit()
     conn.close()
 
 # --- User Authentication Helper Functions ---
+# scrypt cost parameters (n * r * 128 bytes = 16 MB of memory per hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_PREFIX = 'scrypt$'
+
+# hashlib.scrypt releases the GIL; running it on a small dedicated pool keeps
+# the number of concurrent 16 MB KDF runs bounded.
+_KDF_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='kdf')
+
+def _scrypt_hex(password, salt):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, maxmem=64 * 1024 * 1024
+    ).hex()
+
 def hash_password(password):
-    """Generate a salt and hash for the password"""
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return password_hash, salt
+    """Generate a salt and scrypt hash for the password"""
+    salt = secrets.token_bytes(16)
+    digest = _KDF_EXECUTOR.submit(_scrypt_hex, password, salt).result()
+    return SCRYPT_PREFIX + digest, salt.hex()
 
 def verify_password(password, password_hash, salt):
-    """Verify a password against its hash and salt"""
-    return hashlib.sha256((password + salt).encode()).hexdigest() == password_hash
+    """Verify a password against its hash and salt (scrypt, or legacy single-round SHA-256)"""
+    if password_hash.startswith(SCRYPT_PREFIX):
+        digest = _KDF_EXECUTOR.submit(_scrypt_hex, password, bytes.fromhex(salt)).result()
+        return hmac.compare_digest(SCRYPT_PREFIX + digest, password_hash)
+    return hmac.compare_digest(hashlib.sha256((password + salt).encode()).hexdigest(), password_hash)
+
+SQL_GET_USER_BY_USERNAME = (
+    'SELECT id, fullname, username, password_hash, salt, role, state, admin_level, created_at '
+    'FROM users WHERE username = ?'
+)
+SQL_GET_USER_BY_ID = (
+    'SELECT id, fullname, username, role, state, admin_level, created_at '
+    'FROM users WHERE id = ?'
+)
 
 def get_user_by_username(username):
     """Get user from database by username"""
     conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE username = ?', (username,)
-    ).fetchone()
+    user = conn.execute(SQL_GET_USER_BY_USERNAME, (username,)).fetchone()
     conn.close()
     return user
 
@@ -841,35 +1636,34 @@ def signup():
             if admin_level == 'central' and state:
                 return jsonify({"error": "Central admins should not select a state."}), 400
         
-        # Check if user already exists
-        existing_user = get_user_by_username(username)
-        if existing_user:
+        # Check if user already exists (before paying for the password hash)
+        with closing(get_db_connection()) as conn:
+            exists = conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone()
+        if exists:
             return jsonify({"error": "Username already exists. Please use a different username."}), 409
         
-        # Hash password
+        # Hash password (scrypt, tens of ms) with no connection checked out
         password_hash, salt = hash_password(password)
         
-        # Save user to database
-        conn = get_db_connection()
-        try:
-            conn.execute(
-                'INSERT INTO users (fullname, username, password_hash, salt, role, state, admin_level, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        # Save user to database; a concurrent signup that took the username
+        # in the meantime leaves the row untouched
+        with closing(get_db_connection()) as conn, conn:
+            cur = conn.execute(
+                'INSERT INTO users (fullname, username, password_hash, salt, role, state, admin_level, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(username) DO NOTHING',
                 (fullname or username, username, password_hash, salt, role, state if role != 'admin' or admin_level == 'state' else None, admin_level if role == 'admin' else None, datetime.now().isoformat())
             )
-            conn.commit()
-            
-            return jsonify({
-                "message": "User created successfully.",
-                "fullname": fullname,
-                "username": username,
-                "role": role,
-                "state": state
-            }), 201
-        
-        except sqlite3.IntegrityError:
+            created = cur.rowcount > 0
+        if not created:
             return jsonify({"error": "Username already exists. Please use a different username."}), 409
-        finally:
-            conn.close()
+        
+        return jsonify({
+            "message": "User created successfully.",
+            "fullname": fullname,
+            "username": username,
+            "role": role,
+            "state": state
+        }), 201
     
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -898,26 +1692,33 @@ def login():
         if not verify_password(password, user['password_hash'], user['salt']):
             return jsonify({"error": "Username and password not found."}), 401
         
-        # Update last login
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE users SET last_login = ? WHERE id = ?',
-            (datetime.now().isoformat(), user['id'])
-        )
-        conn.commit()
-        conn.close()
+        # Update last login, moving legacy SHA-256 hashes onto scrypt while the
+        # plaintext password is at hand
+        last_login = datetime.now().isoformat()
+        if user['password_hash'].startswith(SCRYPT_PREFIX):
+            update = ('UPDATE users SET last_login = ? WHERE id = ?', (last_login, user['id']))
+        else:
+            password_hash, salt = hash_password(password)
+            update = (
+                'UPDATE users SET last_login = ?, password_hash = ?, salt = ? WHERE id = ?',
+                (last_login, password_hash, salt, user['id'])
+            )
+        # Checked out only for the update (not across the password checks above);
+        # committed, or rolled back on error, and released before responding
+        with closing(get_db_connection()) as conn, conn:
+            conn.execute(*update)
         
         return jsonify({
             "message": "Login successful.",
             "user": {
                 "id": user['id'],
-                "fullname": user['fullname'] if user['fullname'] else user['username'],  # Fallback to username if fullname is NULL
+                "fullname": user['fullname'] or user['username'],  # Fallback to username if fullname is NULL
                 "username": user['username'],
                 "role": user['role'],
-                "state": user['state'] if user['state'] else '',  # Fallback to empty string if state is NULL
-                "admin_level": user['admin_level'] if 'admin_level' in user.keys() else None,
+                "state": user['state'] or '',  # Fallback to empty string if state is NULL
+                "admin_level": user['admin_level'],  # always selected by SQL_GET_USER_BY_USERNAME
                 "created_at": user['created_at'],
-                "last_login": datetime.now().isoformat()
+                "last_login": last_login
             }
         }), 200
     
@@ -925,6 +1726,20 @@ def login():
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 # --- Project Management API ---
+# Forecast key -> material reserved in inventory when a project is created
+RESERVED_MATERIALS = {
+    'steel': 'Steel',
+    'conductor': 'Conductor',
+    'transformers': 'Transformers',
+    'earthwire': 'Earthwire',
+    'foundation': 'Foundation',
+    'reactors': 'Reactors',
+    'tower': 'Tower'
+}
+SQL_RESERVED_MATERIAL_IDS = (
+    f"SELECT name, id FROM materials WHERE name IN ({', '.join('?' * len(RESERVED_MATERIALS))})"
+)
+
 @app.route('/projects', methods=['POST'])
 def create_project():
     """Create a new project"""
@@ -967,23 +1782,12 @@ def create_project():
         }
         
         # Generate forecasts using internal prediction logic
+        # (the same path as /predict_all; a model that fails forecasts 0.0)
         try:
-            forecasts = {}
-            for model_name, model_data in LOADED_MODELS.items():
-                try:
-                    feature_vector = create_feature_vector(prediction_data, model_data["columns"])
-                    final_features = np.array([feature_vector], dtype=np.float32)
-                    scaled_features = model_data["scaler"].transform(final_features)
-                    
-                    prediction = model_data["session"].run(
-                        [model_data["output_name"]], 
-                        {model_data["input_name"]: scaled_features}
-                    )[0]
-                    
-                    forecasts[model_name] = float(prediction[0][0]) if prediction.size > 0 else 0.0
-                except Exception as model_error:
-                    print(f"Error predicting {model_name}: {model_error}")
-                    forecasts[model_name] = 0.0
+            forecasts = {
+                model_name: 0.0 if prediction == "Prediction Error" else prediction
+                for model_name, prediction in predict_one(prediction_data).items()
+            }
                     
         except Exception as pred_error:
             return jsonify({"error": f"Prediction failed: {str(pred_error)}"}), 500
@@ -991,6 +1795,7 @@ def create_project():
         # Save project to database
         conn = get_db_connection()
         cur = conn.cursor()
+        current_time = datetime.now().isoformat()
         
         cur.execute("""
             INSERT INTO projects 
@@ -1004,51 +1809,43 @@ def create_project():
             created_by_user_id, created_by_username, created_by_role, status,
             forecasts.get('steel', 0), forecasts.get('conductor', 0), forecasts.get('transformers', 0),
             forecasts.get('earthwire', 0), forecasts.get('foundation', 0), forecasts.get('reactors', 0), 
-            forecasts.get('tower', 0), datetime.now().isoformat()
+            forecasts.get('tower', 0), current_time
         ))
         
         project_id = cur.lastrowid
         
         # AUTO-RESERVE MATERIALS based on forecast
         try:
-            # Get material IDs for forecasted materials
-            material_mapping = {
-                'steel': 'Steel',
-                'conductor': 'Conductor', 
-                'transformers': 'Transformers',
-                'earthwire': 'Earthwire',
-                'foundation': 'Foundation',
-                'reactors': 'Reactors',
-                'tower': 'Tower'
-            }
-            
-            for forecast_key, material_name in material_mapping.items():
+            # Look up all forecasted materials' IDs in one query
+            cur.execute(SQL_RESERVED_MATERIAL_IDS, tuple(RESERVED_MATERIALS.values()))
+            material_ids = dict(cur.fetchall())
+
+            reserved = []
+            for forecast_key, material_name in RESERVED_MATERIALS.items():
                 forecast_value = forecasts.get(forecast_key, 0)
-                if forecast_value > 0:
-                    # Get material ID
-                    cur.execute('SELECT id FROM materials WHERE name = ?', (material_name,))
-                    material_row = cur.fetchone()
-                    
-                    if material_row:
-                        material_id = material_row[0]
-                        
-                        # Update reserved stock in inventory
-                        cur.execute("""
-                            UPDATE inventory 
-                            SET reserved_stock = reserved_stock + ?,
-                                last_updated = ?
-                            WHERE material_id = ?
-                        """, (forecast_value, datetime.now().isoformat(), material_id))
-                        
-                        # Log the reservation in material_usage with negative quantity to indicate reservation
-                        cur.execute("""
-                            INSERT INTO material_usage 
-                            (project_id, material_id, quantity_used, unit_cost, total_cost, usage_date, logged_by, notes)
-                            VALUES (?, ?, ?, 0, 0, ?, ?, ?)
-                        """, (project_id, material_id, -forecast_value, datetime.now().isoformat(), 
-                              created_by_user_id, f'Auto-reserved based on AI forecast for project creation'))
-                        
-                        print(f"Reserved {forecast_value} units of {material_name} for project {project_id}")
+                material_id = material_ids.get(material_name)
+                if forecast_value > 0 and material_id is not None:
+                    reserved.append((material_name, material_id, forecast_value))
+
+            # Update reserved stock in inventory
+            cur.executemany("""
+                UPDATE inventory 
+                SET reserved_stock = reserved_stock + ?,
+                    last_updated = ?
+                WHERE material_id = ?
+            """, [(forecast_value, current_time, material_id) for _, material_id, forecast_value in reserved])
+
+            # Log the reservations in material_usage with negative quantity to indicate reservation
+            cur.executemany("""
+                INSERT INTO material_usage 
+                (project_id, material_id, quantity_used, unit_cost, total_cost, usage_date, logged_by, notes)
+                VALUES (?, ?, ?, 0, 0, ?, ?, ?)
+            """, [(project_id, material_id, -forecast_value, current_time,
+                   created_by_user_id, 'Auto-reserved based on AI forecast for project creation')
+                  for _, material_id, forecast_value in reserved])
+
+            for material_name, _, forecast_value in reserved:
+                print(f"Reserved {forecast_value} units of {material_name} for project {project_id}")
         
         except Exception as e:
             print(f"Warning: Failed to auto-reserve materials: {e}")
@@ -1056,6 +1853,8 @@ def create_project():
         
         conn.commit()
         conn.close()
+        invalidate_project_listings()
+        invalidate_inventory_dashboard()
         
         return jsonify({
             "message": "Project created successfully.",
@@ -1067,6 +1866,102 @@ def create_project():
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+# State -> cities served (same as frontend)
+STATE_MAPPING = {
+    "Uttar Pradesh": ["Lucknow", "Kanpur", "Meerut", "Agra", "Varanasi"],
+    "Maharashtra": ["Mumbai", "Pune", "Nagpur"],
+    "Karnataka": ["Bengaluru", "Mysore"],
+    "Tamil Nadu": ["Chennai", "Coimbatore"],
+    "West Bengal": ["Kolkata", "Siliguri"],
+    "Rajasthan": ["Jaipur", "Jodhpur"],
+    "Gujarat": ["Ahmedabad", "Surat"],
+    "Telangana": ["Hyderabad", "Warangal"],
+    "Delhi": ["Delhi"],
+}
+# Reverse index: city -> state (built in reverse so the first listed state wins
+# for a shared city name)
+CITY_TO_STATE = {city: state for state, cities in reversed(STATE_MAPPING.items()) for city in cities}
+
+PROJECT_LIST_COLUMNS = """
+    id, budget, location, tower_type, substation_type, geo, taxes,
+    created_by_username, created_by_role, status, created_at,
+    steel_forecast, conductor_forecast, transformers_forecast, earthwire_forecast,
+    foundation_forecast, reactors_forecast, tower_forecast
+"""
+SQL_LIST_PROJECTS_CENTRAL = f"""
+    SELECT {PROJECT_LIST_COLUMNS} FROM projects
+    WHERE status IN ('pending','approved','declined','finished','deleted')
+    ORDER BY created_at DESC
+"""
+SQL_LIST_PROJECTS_ALL = f"""
+    SELECT {PROJECT_LIST_COLUMNS} FROM projects
+    ORDER BY created_at DESC
+"""
+# One statement per state: projects located in any of that state's cities
+SQL_LIST_PROJECTS_BY_STATE = {
+    state: f"""
+    SELECT {PROJECT_LIST_COLUMNS} FROM projects
+    WHERE location IN ({', '.join('?' * len(cities))})
+    ORDER BY created_at DESC
+"""
+    for state, cities in STATE_MAPPING.items()
+}
+SQL_ADMIN_OWN_LOCATIONS = """
+    SELECT DISTINCT location FROM projects
+    WHERE created_by_username = ? AND created_by_role = 'admin'
+"""
+SQL_LIST_PROJECTS_BY_CREATOR = f"""
+    SELECT {PROJECT_LIST_COLUMNS} FROM projects
+    WHERE created_by_user_id = ?
+    ORDER BY created_at DESC
+"""
+
+def infer_admin_state(cur, username):
+    """
+    State of the projects an admin created themselves, for admins with no
+    stored state. If they span several states the first one in STATE_MAPPING
+    order wins; None if no location maps to a state.
+    """
+    cur.execute(SQL_ADMIN_OWN_LOCATIONS, (username,))
+    own_states = {CITY_TO_STATE.get(location) for (location,) in cur.fetchall()}
+    return next((state for state in STATE_MAPPING if state in own_states), None)
+
+def user_project_dict(row):
+    (project_id, budget, location, tower_type, substation_type, geo, taxes,
+     created_by, created_by_role, status, created_at,
+     steel, conductor, transformers, earthwire, foundation, reactors, tower) = row
+    return {
+        'id': project_id,
+        'budget': budget,
+        'location': location,
+        'towerType': tower_type,
+        'substationType': substation_type,
+        'geo': geo,
+        'taxes': taxes,
+        'createdBy': created_by,
+        'createdByRole': created_by_role,
+        'status': status,
+        'createdAt': created_at,
+        # Individual forecast fields for Dashboard component
+        'steel_forecast': steel,
+        'conductor_forecast': conductor,
+        'transformers_forecast': transformers,
+        'earthwire_forecast': earthwire,
+        'foundation_forecast': foundation,
+        'reactors_forecast': reactors,
+        'tower_forecast': tower,
+        # Grouped forecasts for other components
+        'allForecasts': {
+            'steel': steel,
+            'conductor': conductor,
+            'transformers': transformers,
+            'earthwire': earthwire,
+            'foundation': foundation,
+            'reactors': reactors,
+            'tower': tower
+        }
+    }
+
 @app.route('/projects/<int:user_id>', methods=['GET'])
 def get_user_projects(user_id):
     """Get projects for a specific user based on their role"""
@@ -1078,107 +1973,28 @@ def get_user_projects(user_id):
         
         conn = get_db_connection()
         cur = conn.cursor()
+        cur.row_factory = None  # plain tuples, unpacked in PROJECT_LIST_COLUMNS order
         
         if user['role'] == 'admin':
             # If central admin: can only approve/decline (see frontend), show all pending projects
             if (user['admin_level'] or '').lower() == 'central':
-                cur.execute("""
-                    SELECT * FROM projects 
-                    WHERE status IN ('pending','approved','declined','finished','deleted')
-                    ORDER BY created_at DESC
-                """)
+                cur.execute(SQL_LIST_PROJECTS_CENTRAL)
+            elif user['state'] in STATE_MAPPING:
+                # Admin sees all projects located in their own state
+                cur.execute(SQL_LIST_PROJECTS_BY_STATE[user['state']], STATE_MAPPING[user['state']])
             else:
-                # Admin sees all projects from their state
-                # First get the user's state based on a project they created (if any)
-                # For now, we'll get all projects and filter by state in the response
-                cur.execute("""
-                    SELECT * FROM projects 
-                    ORDER BY created_at DESC
-                """)
+                # No known state stored for this admin: infer it from the projects
+                # they created themselves, or show everything if that fails too
+                admin_state = infer_admin_state(cur, user['username'])
+                if admin_state:
+                    cur.execute(SQL_LIST_PROJECTS_BY_STATE[admin_state], STATE_MAPPING[admin_state])
+                else:
+                    cur.execute(SQL_LIST_PROJECTS_ALL)
         else:
             # Employee sees only their own projects
-            cur.execute("""
-                SELECT * FROM projects 
-                WHERE created_by_user_id = ?
-                ORDER BY created_at DESC
-            """, (user_id,))
-        
-        projects = []
-        for row in cur.fetchall():
-            project = {
-                'id': row['id'],
-                'budget': row['budget'],
-                'location': row['location'],
-                'towerType': row['tower_type'],
-                'substationType': row['substation_type'],
-                'geo': row['geo'],
-                'taxes': row['taxes'],
-                'createdBy': row['created_by_username'],
-                'createdByRole': row['created_by_role'],
-                'status': row['status'],
-                'createdAt': row['created_at'],
-                # Individual forecast fields for Dashboard component
-                'steel_forecast': row['steel_forecast'],
-                'conductor_forecast': row['conductor_forecast'],
-                'transformers_forecast': row['transformers_forecast'],
-                'earthwire_forecast': row['earthwire_forecast'],
-                'foundation_forecast': row['foundation_forecast'],
-                'reactors_forecast': row['reactors_forecast'],
-                'tower_forecast': row['tower_forecast'],
-                # Grouped forecasts for other components
-                'allForecasts': {
-                    'steel': row['steel_forecast'],
-                    'conductor': row['conductor_forecast'],
-                    'transformers': row['transformers_forecast'],
-                    'earthwire': row['earthwire_forecast'],
-                    'foundation': row['foundation_forecast'],
-                    'reactors': row['reactors_forecast'],
-                    'tower': row['tower_forecast']
-                }
-            }
-            projects.append(project)
-        
-        conn.close()
-        
-        # Filter projects by state for admin users
-        if user['role'] == 'admin':
-            # State mapping (same as frontend)
-            state_mapping = {
-                "Uttar Pradesh": ["Lucknow", "Kanpur", "Meerut", "Agra", "Varanasi"],
-                "Maharashtra": ["Mumbai", "Pune", "Nagpur"],
-                "Karnataka": ["Bengaluru", "Mysore"],
-                "Tamil Nadu": ["Chennai", "Coimbatore"],
-                "West Bengal": ["Kolkata", "Siliguri"],
-                "Rajasthan": ["Jaipur", "Jodhpur"],
-                "Gujarat": ["Ahmedabad", "Surat"],
-                "Telangana": ["Hyderabad", "Warangal"],
-                "Delhi": ["Delhi"],
-            }
-            
-            # Get admin's state (we'll need to determine this somehow)
-            # For now, let's assume we can get it from their first project or set a default
-            admin_state = None
-            for state, cities in state_mapping.items():
-                if any(project['location'] in cities for project in projects if project['createdByRole'] == 'admin' and project['createdBy'] == user['username']):
-                    admin_state = state
-                    break
-            
-            if admin_state:
-                # Filter projects to only show those from the admin's state
-                filtered_projects = []
-                for project in projects:
-                    project_state = None
-                    for state, cities in state_mapping.items():
-                        if project['location'] in cities:
-                            project_state = state
-                            break
-                    
-                    if project_state == admin_state:
-                        filtered_projects.append(project)
-                
-                projects = filtered_projects
+            cur.execute(SQL_LIST_PROJECTS_BY_CREATOR, (user_id,))
         
-        return jsonify({"projects": projects}), 200
+        return stream_json_rows('projects', cur, user_project_dict)
         
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -1197,42 +2013,73 @@ def update_project_status(project_id):
         if new_status not in ['pending', 'approved', 'declined', 'deleted', 'finished']:
             return jsonify({"error": "Invalid status."}), 400
         
-        # Verify user is admin (optional - could be done with proper auth middleware)
-        user = get_user_by_id(user_id) if user_id else None
-        if user and user['role'] != 'admin':
-            return jsonify({"error": "Only admins can update project status."}), 403
-        
-        conn = get_db_connection()
-        cur = conn.cursor()
+        # Verify user is admin (optional - could be done with proper auth middleware):
+        # the update is skipped if user_id names an existing non-admin user
+        with closing(get_db_connection()) as conn, conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE projects 
+                SET status = ?
+                WHERE id = ?
+                  AND NOT EXISTS (SELECT 1 FROM users WHERE id = ? AND role IS NOT 'admin')
+            """, (new_status, project_id, user_id or None))
+            
+            if cur.rowcount == 0:
+                # Nothing updated: tell a non-admin user apart from a missing project
+                user = conn.execute('SELECT role FROM users WHERE id = ?', (user_id or None,)).fetchone()
+                if user and user['role'] != 'admin':
+                    return jsonify({"error": "Only admins can update project status."}), 403
+                return jsonify({"error": "Project not found."}), 404
         
-        cur.execute("""
-            UPDATE projects 
-            SET status = ?
-            WHERE id = ?
-        """, (new_status, project_id))
+        invalidate_project_listings()
         
-        if cur.rowcount == 0:
-            conn.close()
-            return jsonify({"error": "Project not found."}), 404
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({"message": "Project status updated successfully."}), 200
+        return jsonify({"message": "Project status updated successfully."}), 200
         
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
-def get_user_by_id(user_id):
-    """Helper function to get user by ID"""
+# Seconds a user looked up by ID may be served from memory; the selected
+# columns are only ever written at signup
+USER_CACHE_TTL = 5
+
+@lru_cache(maxsize=1024)
+def _get_user_by_id_cached(user_id, ttl_bucket):
     conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
+    user = conn.execute(SQL_GET_USER_BY_ID, (user_id,)).fetchone()
     conn.close()
+    if user is None:
+        # Raising keeps misses out of the cache, so a new signup is found at once
+        raise LookupError(user_id)
     return user
 
+def get_user_by_id(user_id):
+    """Helper function to get user by ID (repeat lookups within USER_CACHE_TTL skip the database)"""
+    try:
+        return _get_user_by_id_cached(user_id, int(time.monotonic() // USER_CACHE_TTL))
+    except LookupError:
+        return None
+
 # --- Optimal Ordering Schedule ---
+_YMD_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+@lru_cache(maxsize=1024)
+def _parse_ymd(date_str):
+    """Parse a YYYY-MM-DD string; returns (datetime, canonical YYYY-MM-DD string)."""
+    if _YMD_RE.fullmatch(date_str):
+        # Zero-padded dates are already canonical; slicing skips strptime
+        return datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10])), date_str
+    # Other forms strptime accepts, e.g. unpadded "2025-1-5"
+    parsed = datetime.strptime(date_str, '%Y-%m-%d')
+    return parsed, parsed.strftime('%Y-%m-%d')
+
+def _order_date(need_by_dt, lead_time_days):
+    """need_by_dt minus lead_time_days, as a YYYY-MM-DD string."""
+    # Day-ordinal arithmetic and isoformat() avoid a timedelta and strftime per material
+    order_day = date.fromordinal(need_by_dt.toordinal() - lead_time_days)
+    if order_day.year < 1000:
+        return order_day.strftime('%Y-%m-%d')  # strftime leaves such years unpadded
+    return order_day.isoformat()
+
 @app.route('/ordering/schedule', methods=['POST'])
 def ordering_schedule():
     """
@@ -1264,44 +2111,47 @@ def ordering_schedule():
         if lead_time_overrides and not isinstance(lead_time_overrides, dict):
             return jsonify({ 'error': 'lead_time_overrides must be an object' }), 400
 
+        # (order_date, item) pairs, sorted on the date string below
         schedule_items = []
 
+        # Valid overrides keyed by lowercased material name, normalized once
+        overrides = {}
+        for name, value in lead_time_overrides.items():
+            try:
+                lt = int(value)
+            except Exception:
+                continue
+            if lt > 0:
+                overrides[str(name).lower()] = lt
+
         # Helper to get lead time for a material (override -> default)
         def resolve_lead_time_days(material_name: str) -> int:
             name_key = str(material_name).lower()
-            if name_key in lead_time_overrides:
-                try:
-                    lt = int(lead_time_overrides[name_key])
-                    if lt > 0:
-                        return lt
-                except Exception:
-                    pass
-            # Fallback default
-            return int(MATERIAL_DEFAULTS.get(name_key, 75))
+            return overrides.get(name_key) or int(MATERIAL_DEFAULTS.get(name_key, 75))
 
         # Case 1: single need_by_date for many materials
         if 'need_by_date' in payload:
             need_by_str = str(payload['need_by_date'])
             try:
-                need_by_dt = datetime.strptime(need_by_str, '%Y-%m-%d')
+                need_by_dt, need_by_out = _parse_ymd(need_by_str)
             except ValueError:
                 return jsonify({ 'error': 'need_by_date must be YYYY-MM-DD' }), 400
 
             materials = payload.get('materials')
             if materials is None:
-                materials = list(MATERIAL_DEFAULTS.keys())
+                materials = DEFAULT_SCHEDULE_MATERIALS
             if not isinstance(materials, list) or not materials:
                 return jsonify({ 'error': 'materials must be a non-empty list when provided' }), 400
 
             for m in materials:
                 lt_days = resolve_lead_time_days(m)
-                order_dt = need_by_dt - timedelta(days=int(lt_days))
-                schedule_items.append({
+                order_date = _order_date(need_by_dt, lt_days)
+                schedule_items.append((order_date, {
                     'material': m,
-                    'need_by_date': need_by_dt.strftime('%Y-%m-%d'),
-                    'lead_time_days': int(lt_days),
-                    'order_date': order_dt.strftime('%Y-%m-%d'),
-                })
+                    'need_by_date': need_by_out,
+                    'lead_time_days': lt_days,
+                    'order_date': order_date,
+                }))
 
         # Case 2: per-material need_by_dates map
         elif 'need_by_dates' in payload:
@@ -1310,29 +2160,37 @@ def ordering_schedule():
                 return jsonify({ 'error': 'need_by_dates must be a non-empty object' }), 400
             for m, date_str in nb_map.items():
                 try:
-                    need_by_dt = datetime.strptime(str(date_str), '%Y-%m-%d')
+                    need_by_dt, need_by_out = _parse_ymd(str(date_str))
                 except ValueError:
                     return jsonify({ 'error': f'Invalid date for {m}: must be YYYY-MM-DD' }), 400
                 lt_days = resolve_lead_time_days(m)
-                order_dt = need_by_dt - timedelta(days=int(lt_days))
-                schedule_items.append({
+                order_date = _order_date(need_by_dt, lt_days)
+                schedule_items.append((order_date, {
                     'material': m,
-                    'need_by_date': need_by_dt.strftime('%Y-%m-%d'),
-                    'lead_time_days': int(lt_days),
-                    'order_date': order_dt.strftime('%Y-%m-%d'),
-                })
+                    'need_by_date': need_by_out,
+                    'lead_time_days': lt_days,
+                    'order_date': order_date,
+                }))
 
         else:
             return jsonify({ 'error': 'Provide either need_by_date or need_by_dates' }), 400
 
-        # Sort by order_date ascending for readability
-        schedule_items.sort(key=lambda x: x['order_date'])
-        return jsonify({ 'schedule': schedule_items })
+        # Sort by order_date ascending for readability (YYYY-MM-DD strings sort
+        # chronologically; the sort is stable so ties keep request order)
+        schedule_items.sort(key=itemgetter(0))
+        return jsonify({ 'schedule': [item for _, item in schedule_items] })
 
     except Exception as e:
         return jsonify({ 'error': str(e) }), 500
 
 # --- Periodic Forecasting Endpoints ---
+# Interval between runs of a periodic forecast schedule
+FREQUENCY_DELTAS = {
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30),
+    'quarterly': timedelta(days=90),
+}
+
 @app.route('/forecast/schedule', methods=['POST'])
 def create_forecast_schedule():
     """Create a periodic forecast schedule for a project"""
@@ -1344,17 +2202,12 @@ def create_forecast_schedule():
         if not project_id:
             return jsonify({'error': 'project_id is required'}), 400
         
-        if frequency not in ['weekly', 'monthly', 'quarterly']:
+        if frequency not in FREQUENCY_DELTAS:
             return jsonify({'error': 'frequency must be weekly, monthly, or quarterly'}), 400
         
         # Calculate next run date
         now = datetime.now()
-        if frequency == 'weekly':
-            next_run = now + timedelta(weeks=1)
-        elif frequency == 'monthly':
-            next_run = now + timedelta(days=30)
-        else:  # quarterly
-            next_run = now + timedelta(days=90)
+        next_run = now + FREQUENCY_DELTAS[frequency]
         
         conn = get_db_connection()
         cur = conn.cursor()
@@ -1382,6 +2235,23 @@ def create_forecast_schedule():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def forecast_history_dict(row):
+    return {
+        'id': row['id'],
+        'forecast_date': row['forecast_date'],
+        'phase_id': row['phase_id'],
+        'forecasts': {
+            'steel': row['steel_forecast'],
+            'conductor': row['conductor_forecast'],
+            'transformers': row['transformers_forecast'],
+            'earthwire': row['earthwire_forecast'],
+            'foundation': row['foundation_forecast'],
+            'reactors': row['reactors_forecast'],
+            'tower': row['tower_forecast']
+        },
+        'created_at': row['created_at']
+    }
+
 @app.route('/forecast/history/<project_id>', methods=['GET'])
 def get_forecast_history(project_id):
     """Get forecast history for a project"""
@@ -1395,39 +2265,23 @@ def get_forecast_history(project_id):
             ORDER BY forecast_date DESC
         """, (project_id,))
         
-        history = []
-        for row in cur.fetchall():
-            history.append({
-                'id': row['id'],
-                'forecast_date': row['forecast_date'],
-                'phase_id': row['phase_id'],
-                'forecasts': {
-                    'steel': row['steel_forecast'],
-                    'conductor': row['conductor_forecast'],
-                    'transformers': row['transformers_forecast'],
-                    'earthwire': row['earthwire_forecast'],
-                    'foundation': row['foundation_forecast'],
-                    'reactors': row['reactors_forecast'],
-                    'tower': row['tower_forecast']
-                },
-                'created_at': row['created_at']
-            })
-        
-        conn.close()
-        return jsonify({'history': history})
+        return stream_json_rows('history', cur, forecast_history_dict)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/forecast/run_periodic', methods=['POST'])
-def run_periodic_forecast():
-    """Run periodic forecasts for all active schedules"""
+def run_due_forecasts():
+    """Forecasts every due schedule, records the history and moves next_run on.
+
+    Returns one result dict per schedule.
+    """
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cur = conn.cursor()
         
         # Get all active schedules that are due
-        today = datetime.now().strftime('%Y-%m-%d')
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
         cur.execute("""
             SELECT * FROM forecast_schedules 
             WHERE is_active = 1 AND next_run <= ?
@@ -1436,80 +2290,121 @@ def run_periodic_forecast():
         schedules = cur.fetchall()
         results = []
         
-        for schedule in schedules:
+        # Get project data (you'll need to implement this based on your project storage)
+        # For now, we'll use a mock project data
+        project_datas = [{
+            'budget': '1000000',
+            'location': 'Mumbai',
+            'towerType': '220 kV',
+            'substationType': 'Indoor',
+            'geo': 'Urban',
+            'taxes': 'Yes'
+        } for _ in schedules]
+        
+        # Generate forecasts for every due schedule at once: one stacked input
+        # matrix and one session run per model
+        forecasts_by_row = [{} for _ in schedules]
+        forecast_error = None
+        if schedules:
+            try:
+                features = np.stack([create_feature_vector(project_data, LOADED_MODELS['steel'])
+                                     for project_data in project_datas])
+                # Every model scales into the same buffer, leaving features intact
+                scaled = np.empty_like(features)
+                for model_assets, forecast_key in zip(MODEL_ASSETS, FORECAST_KEYS):
+                    predictions = run_model_batch(model_assets, features, out=scaled)
+                    for forecasts, prediction in zip(forecasts_by_row, predictions):
+                        forecasts[forecast_key] = prediction
+            except Exception as e:
+                forecast_error = str(e)
+        
+        created_at = now.strftime('%Y-%m-%d %H:%M:%S')
+        # Next run date per frequency; anything unrecognised runs quarterly
+        next_runs = {frequency: (now + delta).strftime('%Y-%m-%d') for frequency, delta in FREQUENCY_DELTAS.items()}
+        history_rows = []
+        schedule_updates = []
+        for schedule, forecasts in zip(schedules, forecasts_by_row):
             project_id = schedule['project_id']
             frequency = schedule['frequency']
             
-            # Get project data (you'll need to implement this based on your project storage)
-            # For now, we'll use a mock project data
-            project_data = {
-                'budget': '1000000',
-                'location': 'Mumbai',
-                'towerType': '220 kV',
-                'substationType': 'Indoor',
-                'geo': 'Urban',
-                'taxes': 'Yes'
-            }
+            if forecast_error is not None:
+                results.append({
+                    'project_id': project_id,
+                    'status': 'error',
+                    'error': forecast_error
+                })
+                continue
             
-            # Generate forecast
-            try:
-                features_ordered = create_feature_vector(project_data, LOADED_MODELS['steel']['columns'])
-                input_array = np.array(features_ordered, dtype=np.float32).reshape(1, -1)
-                
-                forecasts = {}
-                for model_name, model_assets in LOADED_MODELS.items():
-                    scaled_input = model_assets['scaler'].transform(input_array)
-                    prediction = model_assets['session'].run(
-                        [model_assets['output_name']], 
-                        {model_assets['input_name']: scaled_input}
-                    )
-                    forecasts[f'{model_name}_forecast'] = float(prediction[0].flatten()[0])
-                
-                # Store forecast in history
-                cur.execute("""
+            # Store forecast in history
+            history_rows.append((
+                project_id, today,
+                forecasts['steel_forecast'], forecasts['conductor_forecast'],
+                forecasts['transformers_forecast'], forecasts['earthwire_forecast'],
+                forecasts['foundation_forecast'], forecasts['reactors_forecast'],
+                forecasts['tower_forecast'], created_at
+            ))
+            
+            # Update next run date
+            schedule_updates.append((next_runs.get(frequency, next_runs['quarterly']), schedule['id']))
+            
+            results.append({
+                'project_id': project_id,
+                'status': 'success',
+                'forecasts': forecasts
+            })
+        
+        # History rows and next-run updates are written together or not at all
+        if history_rows:
+            with conn:
+                conn.executemany("""
                     INSERT INTO forecast_history 
                     (project_id, forecast_date, steel_forecast, conductor_forecast, 
                      transformers_forecast, earthwire_forecast, foundation_forecast, 
                      reactors_forecast, tower_forecast, created_at)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    project_id, today,
-                    forecasts['steel_forecast'], forecasts['conductor_forecast'],
-                    forecasts['transformers_forecast'], forecasts['earthwire_forecast'],
-                    forecasts['foundation_forecast'], forecasts['reactors_forecast'],
-                    forecasts['tower_forecast'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ))
-                
-                # Update next run date
-                if frequency == 'weekly':
-                    next_run = datetime.now() + timedelta(weeks=1)
-                elif frequency == 'monthly':
-                    next_run = datetime.now() + timedelta(days=30)
-                else:  # quarterly
-                    next_run = datetime.now() + timedelta(days=90)
-                
-                cur.execute("""
+                """, history_rows)
+                conn.executemany("""
                     UPDATE forecast_schedules 
                     SET next_run = ? 
                     WHERE id = ?
-                """, (next_run.strftime('%Y-%m-%d'), schedule['id']))
-                
-                results.append({
-                    'project_id': project_id,
-                    'status': 'success',
-                    'forecasts': forecasts
-                })
-                
-            except Exception as e:
-                results.append({
-                    'project_id': project_id,
-                    'status': 'error',
-                    'error': str(e)
-                })
-        
-        conn.commit()
+                """, schedule_updates)
+    finally:
         conn.close()
-        
+    return results
+
+# Background runs of run_due_forecasts by job id; only the most recent
+# PERIODIC_JOB_HISTORY jobs are kept. One worker, so runs never overlap.
+PERIODIC_JOB_HISTORY = 50
+_PERIODIC_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='periodic')
+_periodic_jobs = {}
+_periodic_jobs_lock = threading.Lock()
+
+def periodic_job_status(future):
+    if not future.done():
+        return {'status': 'running' if future.running() else 'queued'}
+    error = future.exception()
+    if error is not None:
+        return {'status': 'error', 'error': str(error)}
+    results = future.result()
+    return {'status': 'success', 'processed': len(results), 'results': results}
+
+@app.route('/forecast/run_periodic', methods=['POST'])
+def run_periodic_forecast():
+    """Run periodic forecasts for all active schedules
+
+    With ?background=1 the run is queued and 202 is returned straight away;
+    GET /forecast/run_periodic/<job_id> reports how it went.
+    """
+    try:
+        if request.args.get('background'):
+            job_id = secrets.token_hex(8)
+            with _periodic_jobs_lock:
+                _periodic_jobs[job_id] = _PERIODIC_EXECUTOR.submit(run_due_forecasts)
+                while len(_periodic_jobs) > PERIODIC_JOB_HISTORY:
+                    del _periodic_jobs[next(iter(_periodic_jobs))]
+            return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+        
+        results = run_due_forecasts()
         return jsonify({
             'status': 'success',
             'processed': len(results),
@@ -1519,6 +2414,15 @@ def run_periodic_forecast():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/forecast/run_periodic/<job_id>', methods=['GET'])
+def get_periodic_forecast_job(job_id):
+    """Status of a background periodic forecast run"""
+    with _periodic_jobs_lock:
+        future = _periodic_jobs.get(job_id)
+    if future is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, **periodic_job_status(future)})
+
 @app.route('/project/phases', methods=['POST'])
 def create_project_phases():
     """Create project phases for timeline tracking"""
@@ -1530,24 +2434,21 @@ def create_project_phases():
         if not project_id or not phases:
             return jsonify({'error': 'project_id and phases are required'}), 400
         
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(project_id, phase['name'], phase['start_date'], phase['end_date'], now) for phase in phases]
+        
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Clear existing phases
-        cur.execute("DELETE FROM project_phases WHERE project_id = ?", (project_id,))
-        
-        # Insert new phases
-        for phase in phases:
-            cur.execute("""
+        # Replace the project's phases in one transaction
+        with conn:
+            cur.execute("DELETE FROM project_phases WHERE project_id = ?", (project_id,))
+            cur.executemany("""
                 INSERT INTO project_phases 
                 (project_id, phase_name, start_date, end_date, created_at)
                 VALUES (?, ?, ?, ?, ?)
-            """, (
-                project_id, phase['name'], phase['start_date'], 
-                phase['end_date'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ))
+            """, rows)
         
-        conn.commit()
         conn.close()
         
         return jsonify({'status': 'success', 'message': 'Project phases created'})
@@ -1555,6 +2456,19 @@ def create_project_phases():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def project_phase_dict(row):
+    return {
+        'id': row['id'],
+        'phase_name': row['phase_name'],
+        'start_date': row['start_date'],
+        'end_date': row['end_date'],
+        'status': row['status']
+    }
+
+# Phases are only ever replaced wholesale (delete + insert), which always
+# changes the count or the highest id
+SQL_PHASES_FINGERPRINT = 'SELECT COUNT(1), MAX(id) FROM project_phases WHERE project_id = ?'
+
 @app.route('/project/phases/<project_id>', methods=['GET'])
 def get_project_phases(project_id):
     """Get project phases"""
@@ -1562,74 +2476,146 @@ def get_project_phases(project_id):
         conn = get_db_connection()
         cur = conn.cursor()
         
+        etag = listing_etag(cur, SQL_PHASES_FINGERPRINT, (project_id,))
+        if request.if_none_match.contains(etag):
+            conn.close()
+            return not_modified(etag)
+        
         cur.execute("""
-            SELECT * FROM project_phases 
+            SELECT id, phase_name, start_date, end_date, status FROM project_phases 
             WHERE project_id = ? 
             ORDER BY start_date
         """, (project_id,))
         
-        phases = []
-        for row in cur.fetchall():
-            phases.append({
-                'id': row['id'],
-                'phase_name': row['phase_name'],
-                'start_date': row['start_date'],
-                'end_date': row['end_date'],
-                'status': row['status']
-            })
-        
-        conn.close()
-        return jsonify({'phases': phases})
+        response = stream_json_rows('phases', cur, project_phase_dict)
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # --- Project Approval Workflow Endpoints ---
 
-@app.route('/projects/pending/<state>', methods=['GET'])
-def get_pending_projects_by_state(state):
-    """Get pending projects for admin approval by state"""
+# Columns of the per-state approval listings, named and ordered as their JSON
+# keys so rows map straight onto dicts (see row_dicts)
+STATE_PROJECT_COLUMNS = """
+    p.id, p.budget, p.location, p.tower_type, p.substation_type, p.geo, p.taxes, p.status,
+    p.created_by_user_id, p.created_by_username, p.created_by_role,
+    u.fullname AS creator_fullname, u.state AS creator_state,
+    p.created_at, p.steel_forecast, p.conductor_forecast, p.transformers_forecast, p.earthwire_forecast,
+    p.foundation_forecast, p.reactors_forecast, p.tower_forecast
+"""
+# Rejections are stored in the approval columns
+STATE_PROJECT_APPROVAL_COLUMNS = STATE_PROJECT_COLUMNS + """,
+    p.approved_by, p.approval_date AS approved_at, p.approval_notes,
+    CASE WHEN p.status = 'rejected' THEN p.approved_by END AS rejected_by,
+    CASE WHEN p.status = 'rejected' THEN p.approval_date END AS rejected_at,
+    CASE WHEN p.status = 'rejected' THEN p.approval_notes END AS rejection_notes
+"""
+
+def row_dicts(cur):
+    """Row -> dict converter keyed by the column names of cur's current query."""
+    keys = tuple(column[0] for column in cur.description)
+    return lambda row: dict(zip(keys, row))
+
+# The per-state listings the admin UI polls are served from memory for up to
+# PROJECT_LISTING_TTL seconds. Every committed change to projects calls
+# invalidate_project_listings, which moves lookups on to a fresh cache key.
+PROJECT_LISTING_TTL = 10
+_project_listing_generation = 0
+
+def invalidate_project_listings():
+    global _project_listing_generation
+    _project_listing_generation += 1
+
+def _project_listing_key():
+    return _project_listing_generation, int(time.monotonic() // PROJECT_LISTING_TTL)
+
+# Largest page the state listings return when a client passes ?limit=
+MAX_STATE_LISTING_PAGE = 200
+
+def _state_listing_page():
+    """(limit, before_created_at, before_id) from the query string.
+
+    Without ?limit= the whole listing is returned, as before. Passing the
+    next_cursor fields of a page as before_created_at/before_id continues
+    after its last row.
+    """
+    limit = request.args.get('limit', type=int)
+    if not limit or limit <= 0:
+        return None, None, None
+    before_created_at = request.args.get('before_created_at')
+    before_id = request.args.get('before_id', type=int)
+    if before_created_at is None or before_id is None:
+        before_created_at = before_id = None
+    return min(limit, MAX_STATE_LISTING_PAGE), before_created_at, before_id
+
+def _state_listing_query(columns, where, state, limit, before_created_at, before_id):
+    """SQL and parameters for one page (or all) of a per-state project listing."""
+    params = [state]
+    sql = f"""
+        SELECT {columns}
+        FROM projects p
+        JOIN users u ON p.created_by_user_id = u.id
+        WHERE {where}
+    """
+    if before_created_at is not None:
+        sql += " AND (p.created_at, p.id) < (?, ?)"
+        params += [before_created_at, before_id]
+    sql += " ORDER BY p.created_at DESC, p.id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+def _next_cursor(projects, limit):
+    if not limit or len(projects) < limit:
+        return None
+    return {'before_created_at': projects[-1]['created_at'], 'before_id': projects[-1]['id']}
+
+@lru_cache(maxsize=64)
+def _pending_projects_body(state, limit, before_created_at, before_id, generation, ttl_bucket):
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cur = conn.cursor()
+        cur.row_factory = None
         
         # Get pending projects created by employees from the same state
-        cur.execute("""
-            SELECT p.*, u.state as creator_state, u.fullname as creator_fullname
-            FROM projects p
-            JOIN users u ON p.created_by_user_id = u.id
-            WHERE p.status = 'pending' AND u.state = ?
-            ORDER BY p.created_at DESC
-        """, (state,))
-        
-        projects = []
-        for row in cur.fetchall():
-            projects.append({
-                'id': row['id'],
-                'budget': row['budget'],
-                'location': row['location'],
-                'tower_type': row['tower_type'],
-                'substation_type': row['substation_type'],
-                'geo': row['geo'],
-                'taxes': row['taxes'],
-                'status': row['status'],
-                'created_by_user_id': row['created_by_user_id'],
-                'created_by_username': row['created_by_username'],
-                'created_by_role': row['created_by_role'],
-                'creator_fullname': row['creator_fullname'],
-                'creator_state': row['creator_state'],
-                'created_at': row['created_at'],
-                'steel_forecast': row['steel_forecast'],
-                'conductor_forecast': row['conductor_forecast'],
-                'transformers_forecast': row['transformers_forecast'],
-                'earthwire_forecast': row['earthwire_forecast'],
-                'foundation_forecast': row['foundation_forecast'],
-                'reactors_forecast': row['reactors_forecast'],
-                'tower_forecast': row['tower_forecast']
-            })
+        cur.execute(*_state_listing_query(STATE_PROJECT_COLUMNS, "p.status = 'pending' AND u.state = ?",
+                                          state, limit, before_created_at, before_id))
         
+        projects = list(map(row_dicts(cur), cur.fetchall()))
+    finally:
         conn.close()
-        return jsonify({'projects': projects})
+    body = {'projects': projects}
+    if limit:
+        body['next_cursor'] = _next_cursor(projects, limit)
+    return app.json.response(body).get_data()
+
+@lru_cache(maxsize=64)
+def _all_projects_body(state, limit, before_created_at, before_id, generation, ttl_bucket):
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.row_factory = None
+        
+        # Get all projects created by users from the same state
+        cur.execute(*_state_listing_query(STATE_PROJECT_APPROVAL_COLUMNS, "u.state = ?",
+                                          state, limit, before_created_at, before_id))
+        
+        if not limit:
+            return ''.join(json_rows_chunks('projects', cur, row_dicts(cur))).encode()
+        projects = list(map(row_dicts(cur), cur.fetchall()))
+    finally:
+        conn.close()
+    return app.json.response({'projects': projects, 'next_cursor': _next_cursor(projects, limit)}).get_data()
+
+@app.route('/projects/pending/<state>', methods=['GET'])
+def get_pending_projects_by_state(state):
+    """Get pending projects for admin approval by state"""
+    try:
+        body = _pending_projects_body(state, *_state_listing_page(), *_project_listing_key())
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1638,60 +2624,71 @@ def get_pending_projects_by_state(state):
 def get_all_projects_by_state(state):
     """Get ALL projects (approved, rejected, pending) for admin view by state"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get all projects created by users from the same state
-        cur.execute("""
-            SELECT p.*, u.state as creator_state, u.fullname as creator_fullname
-            FROM projects p
-            JOIN users u ON p.created_by_user_id = u.id
-            WHERE u.state = ?
-            ORDER BY p.created_at DESC
-        """, (state,))
-        
-        projects = []
-        for row in cur.fetchall():
-            projects.append({
-                'id': row['id'],
-                'budget': row['budget'],
-                'location': row['location'],
-                'tower_type': row['tower_type'],
-                'substation_type': row['substation_type'],
-                'geo': row['geo'],
-                'taxes': row['taxes'],
-                'status': row['status'],
-                'created_by_user_id': row['created_by_user_id'],
-                'created_by_username': row['created_by_username'],
-                'created_by_role': row['created_by_role'],
-                'creator_fullname': row['creator_fullname'],
-                'creator_state': row['creator_state'],
-                'created_at': row['created_at'],
-                'steel_forecast': row['steel_forecast'],
-                'conductor_forecast': row['conductor_forecast'],
-                'transformers_forecast': row['transformers_forecast'],
-                'earthwire_forecast': row['earthwire_forecast'],
-                'foundation_forecast': row['foundation_forecast'],
-                'reactors_forecast': row['reactors_forecast'],
-                'tower_forecast': row['tower_forecast'],
-                'approved_by': row['approved_by'],
-                'approved_at': row['approval_date'],
-                'approval_notes': row['approval_notes'],
-                'rejected_by': row['approved_by'] if row['status'] == 'rejected' else None,
-                'rejected_at': row['approval_date'] if row['status'] == 'rejected' else None,
-                'rejection_notes': row['approval_notes'] if row['status'] == 'rejected' else None
-            })
-        
-        conn.close()
-        return jsonify({'projects': projects})
+        body = _all_projects_body(state, *_state_listing_page(), *_project_listing_key())
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# The reviewing admin and the project with its creator's state, as one row.
+# Either side comes back as NULLs when it does not exist.
+SQL_PROJECT_REVIEW_CONTEXT = """
+    SELECT a.id, a.role, a.state, p.id, p.status, pu.state
+    FROM (SELECT ? AS admin_id, ? AS project_id) k
+    LEFT JOIN users a ON a.id = k.admin_id
+    LEFT JOIN (projects p JOIN users pu ON p.created_by_user_id = pu.id) ON p.id = k.project_id
+"""
+
+def project_review_error(cur, admin_user_id, project_id, action):
+    """
+    Checks that admin_user_id is an admin from the creator's state and the
+    project is pending. Returns an error response, or None if it may be reviewed.
+    """
+    cur.execute(SQL_PROJECT_REVIEW_CONTEXT, (admin_user_id, project_id))
+    admin_id, admin_role, admin_state, found_project_id, status, creator_state = cur.fetchone()
+    
+    if admin_id is None:
+        return jsonify({'error': 'Admin user not found'}), 404
+    if admin_role != 'admin':
+        return jsonify({'error': f'Only admins can {action} projects'}), 403
+    if found_project_id is None:
+        return jsonify({'error': 'Project not found'}), 404
+    if status != 'pending':
+        return jsonify({'error': 'Project is not pending approval'}), 400
+    # Verify admin is from the same state as project creator
+    if admin_state != creator_state:
+        return jsonify({'error': f'Admin can only {action} projects from their own state'}), 403
+    return None
+
+# Records a review on a pending project when the reviewer is an admin from the
+# creator's state (the same checks as project_review_error)
+SQL_REVIEW_PROJECT = """
+    UPDATE projects 
+    SET status = ?, 
+        approved_by = ?, 
+        approval_date = ?, 
+        approval_notes = ?
+    WHERE id = ? AND status = 'pending' AND EXISTS (
+        SELECT 1 FROM users a JOIN users c ON c.id = projects.created_by_user_id
+        WHERE a.id = ? AND a.role = 'admin' AND a.state IS c.state
+    )
+"""
+
+def review_project(cur, admin_user_id, project_id, action, new_status, notes, review_date):
+    """
+    Sets the project's review status in one conditional UPDATE. Returns an error
+    response if admin_user_id may not review it, or None once updated.
+    """
+    cur.execute(SQL_REVIEW_PROJECT, (new_status, admin_user_id, review_date, notes, project_id, admin_user_id))
+    if cur.rowcount:
+        return None
+    # Nothing was updated: look up which check failed
+    error = project_review_error(cur, admin_user_id, project_id, action)
+    return error or (jsonify({'error': 'Project is not pending approval'}), 400)
+
 @app.route('/projects/<project_id>/approve', methods=['POST'])
 def approve_project(project_id):
     """Approve a project"""
-    conn = None
     try:
         data = request.get_json()
         admin_user_id = data.get('admin_user_id')
@@ -1700,56 +2697,14 @@ def approve_project(project_id):
         if not admin_user_id:
             return jsonify({'error': 'Admin user ID is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Verify the admin user exists and is an admin
-        cur.execute('SELECT role, state FROM users WHERE id = ?', (admin_user_id,))
-        admin_user = cur.fetchone()
-        
-        if not admin_user:
-            conn.close()
-            return jsonify({'error': 'Admin user not found'}), 404
-        
-        if admin_user['role'] != 'admin':
-            conn.close()
-            return jsonify({'error': 'Only admins can approve projects'}), 403
-        
-        # Get project details to verify state match
-        cur.execute("""
-            SELECT p.*, u.state as creator_state 
-            FROM projects p 
-            JOIN users u ON p.created_by_user_id = u.id 
-            WHERE p.id = ?
-        """, (project_id,))
-        
-        project = cur.fetchone()
-        if not project:
-            conn.close()
-            return jsonify({'error': 'Project not found'}), 404
-        
-        if project['status'] != 'pending':
-            conn.close()
-            return jsonify({'error': 'Project is not pending approval'}), 400
-        
-        # Verify admin is from the same state as project creator
-        if admin_user['state'] != project['creator_state']:
-            conn.close()
-            return jsonify({'error': 'Admin can only approve projects from their own state'}), 403
-        
-        # Update project status to approved
+        # Update project status to approved, checking admin, project and creator in the same statement
         approval_date = datetime.now().isoformat()
-        cur.execute("""
-            UPDATE projects 
-            SET status = 'approved', 
-                approved_by = ?, 
-                approval_date = ?, 
-                approval_notes = ?
-            WHERE id = ?
-        """, (admin_user_id, approval_date, approval_notes, project_id))
+        with closing(get_db_connection()) as conn, conn:
+            error = review_project(conn.cursor(), admin_user_id, project_id, 'approve', 'approved', approval_notes, approval_date)
+        if error:
+            return error
         
-        conn.commit()
-        conn.close()
+        invalidate_project_listings()
         
         return jsonify({
             'message': 'Project approved successfully',
@@ -1759,14 +2714,11 @@ def approve_project(project_id):
         }), 200
         
     except Exception as e:
-        if conn:
-            conn.close()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/projects/<project_id>/reject', methods=['POST'])
 def reject_project(project_id):
     """Reject a project"""
-    conn = None
     try:
         data = request.get_json()
         admin_user_id = data.get('admin_user_id')
@@ -1775,56 +2727,14 @@ def reject_project(project_id):
         if not admin_user_id:
             return jsonify({'error': 'Admin user ID is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Verify the admin user exists and is an admin
-        cur.execute('SELECT role, state FROM users WHERE id = ?', (admin_user_id,))
-        admin_user = cur.fetchone()
-        
-        if not admin_user:
-            conn.close()
-            return jsonify({'error': 'Admin user not found'}), 404
-        
-        if admin_user['role'] != 'admin':
-            conn.close()
-            return jsonify({'error': 'Only admins can reject projects'}), 403
-        
-        # Get project details to verify state match
-        cur.execute("""
-            SELECT p.*, u.state as creator_state 
-            FROM projects p 
-            JOIN users u ON p.created_by_user_id = u.id 
-            WHERE p.id = ?
-        """, (project_id,))
-        
-        project = cur.fetchone()
-        if not project:
-            conn.close()
-            return jsonify({'error': 'Project not found'}), 404
-        
-        if project['status'] != 'pending':
-            conn.close()
-            return jsonify({'error': 'Project is not pending approval'}), 400
-        
-        # Verify admin is from the same state as project creator
-        if admin_user['state'] != project['creator_state']:
-            conn.close()
-            return jsonify({'error': 'Admin can only reject projects from their own state'}), 403
-        
-        # Update project status to rejected
+        # Update project status to rejected, checking admin, project and creator in the same statement
         rejection_date = datetime.now().isoformat()
-        cur.execute("""
-            UPDATE projects 
-            SET status = 'rejected', 
-                approved_by = ?, 
-                approval_date = ?, 
-                approval_notes = ?
-            WHERE id = ?
-        """, (admin_user_id, rejection_date, rejection_notes, project_id))
+        with closing(get_db_connection()) as conn, conn:
+            error = review_project(conn.cursor(), admin_user_id, project_id, 'reject', 'rejected', rejection_notes, rejection_date)
+        if error:
+            return error
         
-        conn.commit()
-        conn.close()
+        invalidate_project_listings()
         
         return jsonify({
             'message': 'Project rejected successfully',
@@ -1834,33 +2744,30 @@ def reject_project(project_id):
         }), 200
         
     except Exception as e:
-        if conn:
-            conn.close()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/projects/<project_id>/finish', methods=['PUT'])
 def finish_project(project_id):
     """Mark a project as finished"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if project exists
-        cur.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-        project = cur.fetchone()
-        
-        if not project:
-            return jsonify({'error': 'Project not found'}), 404
+        with closing(get_db_connection()) as conn, conn:
+            cur = conn.cursor()
+            
+            # Check if project exists
+            cur.execute('SELECT 1 FROM projects WHERE id = ?', (project_id,))
+            project = cur.fetchone()
+            
+            if not project:
+                return jsonify({'error': 'Project not found'}), 404
+            
+            # Update project status to finished
+            cur.execute("""
+                UPDATE projects 
+                SET status = 'finished'
+                WHERE id = ?
+            """, (project_id,))
         
-        # Update project status to finished
-        cur.execute("""
-            UPDATE projects 
-            SET status = 'finished'
-            WHERE id = ?
-        """, (project_id,))
-        
-        conn.commit()
-        conn.close()
+        invalidate_project_listings()
         
         return jsonify({
             'message': 'Project marked as finished successfully',
@@ -1874,27 +2781,15 @@ def finish_project(project_id):
 def delete_project(project_id):
     """Delete a project"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if project exists
-        cur.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-        project = cur.fetchone()
-        
-        if not project:
+        # trg_projects_delete_children removes phases, schedules and history
+        with closing(get_db_connection()) as conn, conn:
+            deleted = conn.execute('DELETE FROM projects WHERE id = ?', (project_id,)).rowcount
+        invalidate_project_listings()
+        invalidate_inventory_dashboard()
+
+        if not deleted:
             return jsonify({'error': 'Project not found'}), 404
         
-        # Delete related data first (if any)
-        cur.execute('DELETE FROM project_phases WHERE project_id = ?', (project_id,))
-        cur.execute('DELETE FROM forecast_schedules WHERE project_id = ?', (project_id,))
-        cur.execute('DELETE FROM forecast_history WHERE project_id = ?', (project_id,))
-        
-        # Delete the project
-        cur.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-        
-        conn.commit()
-        conn.close()
-        
         return jsonify({
             'message': 'Project deleted successfully',
             'project_id': project_id
@@ -1905,6 +2800,74 @@ def delete_project(project_id):
 
 # --- INVENTORY MANAGEMENT ENDPOINTS ---
 
+def material_dict(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'category': row[2],
+        'unit': row[3],
+        'unit_cost': row[4],
+        'description': row[5],
+        'current_stock': row[6] or 0,
+        'reserved_stock': row[7] or 0,
+        'available_stock': row[8] or 0,
+        'reorder_point': row[9] or 0,
+        'max_stock': row[10] or 1000,
+        'location': row[11] or 'Unknown',
+        'last_updated': row[12],
+        'delivery_count': row[13],
+        'project_delivered': row[14] if len(row) > 14 else None,
+        'project_used': row[15] if len(row) > 15 else None
+    }
+
+# Material listing, with this project's delivered/used totals when filtered
+SQL_LIST_MATERIALS_FOR_PROJECT = """
+    WITH d AS (
+        SELECT material_id, COUNT(1) AS delivery_count, SUM(quantity_delivered) AS delivered
+        FROM material_deliveries WHERE project_id = ? GROUP BY material_id
+    ), u AS (
+        SELECT material_id, SUM(quantity_sum) AS used
+        FROM material_usage_daily WHERE project_id = ? GROUP BY material_id
+    )
+    SELECT 
+        m.id, m.name, m.category, m.unit, m.unit_cost, m.description,
+        i.current_stock, i.reserved_stock, 
+        (i.current_stock - i.reserved_stock) as available_stock,
+        i.reorder_point, i.max_stock, i.location, i.last_updated,
+        COALESCE(d.delivery_count, 0) as delivery_count,
+        COALESCE(d.delivered, 0) as project_delivered,
+        COALESCE(u.used, 0) as project_used
+    FROM materials m
+    LEFT JOIN inventory i ON m.id = i.material_id
+    LEFT JOIN d ON d.material_id = m.id
+    LEFT JOIN u ON u.material_id = m.id
+    ORDER BY m.category, m.name
+"""
+# Inventory rows get a fresh last_updated on every change; deliveries and
+# usage are append-only, so their highest id moves with every write
+SQL_MATERIALS_FINGERPRINT = """
+    SELECT (SELECT COUNT(1) FROM materials),
+           (SELECT MAX(last_updated) FROM inventory),
+           (SELECT MAX(id) FROM material_deliveries),
+           (SELECT MAX(id) FROM material_usage)
+"""
+SQL_LIST_MATERIALS = """
+    WITH d AS (
+        SELECT material_id, COUNT(1) AS delivery_count
+        FROM material_deliveries GROUP BY material_id
+    )
+    SELECT 
+        m.id, m.name, m.category, m.unit, m.unit_cost, m.description,
+        i.current_stock, i.reserved_stock, 
+        (i.current_stock - i.reserved_stock) as available_stock,
+        i.reorder_point, i.max_stock, i.location, i.last_updated,
+        COALESCE(d.delivery_count, 0) as delivery_count
+    FROM materials m
+    LEFT JOIN inventory i ON m.id = i.material_id
+    LEFT JOIN d ON d.material_id = m.id
+    ORDER BY m.category, m.name
+"""
+
 @app.route('/inventory/materials', methods=['GET'])
 def get_materials():
     """Get all materials with current inventory levels"""
@@ -1912,58 +2875,22 @@ def get_materials():
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Optional project filter for delivery_count
+        etag = listing_etag(cur, SQL_MATERIALS_FINGERPRINT)
+        if request.if_none_match.contains(etag):
+            conn.close()
+            return not_modified(etag)
+        
+        # Optional project filter for delivery_count; deliveries and usage are
+        # aggregated per material once and joined, not re-queried per material row
         project_id_filter = request.args.get('project_id', type=int)
         if project_id_filter:
-            cur.execute("""
-                SELECT 
-                    m.id, m.name, m.category, m.unit, m.unit_cost, m.description,
-                    i.current_stock, i.reserved_stock, 
-                    (i.current_stock - i.reserved_stock) as available_stock,
-                    i.reorder_point, i.max_stock, i.location, i.last_updated,
-                    COALESCE((SELECT COUNT(1) FROM material_deliveries d WHERE d.material_id = m.id AND d.project_id = ?), 0) as delivery_count,
-                    COALESCE((SELECT SUM(d.quantity_delivered) FROM material_deliveries d WHERE d.material_id = m.id AND d.project_id = ?), 0) as project_delivered,
-                    COALESCE((SELECT SUM(mu.quantity_used) FROM material_usage mu WHERE mu.material_id = m.id AND mu.project_id = ?), 0) as project_used
-                FROM materials m
-                LEFT JOIN inventory i ON m.id = i.material_id
-                ORDER BY m.category, m.name
-            """, (project_id_filter, project_id_filter, project_id_filter))
+            cur.execute(SQL_LIST_MATERIALS_FOR_PROJECT, (project_id_filter, project_id_filter))
         else:
-            cur.execute("""
-                SELECT 
-                    m.id, m.name, m.category, m.unit, m.unit_cost, m.description,
-                    i.current_stock, i.reserved_stock, 
-                    (i.current_stock - i.reserved_stock) as available_stock,
-                    i.reorder_point, i.max_stock, i.location, i.last_updated,
-                    COALESCE((SELECT COUNT(1) FROM material_deliveries d WHERE d.material_id = m.id), 0) as delivery_count
-                FROM materials m
-                LEFT JOIN inventory i ON m.id = i.material_id
-                ORDER BY m.category, m.name
-            """)
-        
-        materials = []
-        for row in cur.fetchall():
-            materials.append({
-                'id': row[0],
-                'name': row[1],
-                'category': row[2],
-                'unit': row[3],
-                'unit_cost': row[4],
-                'description': row[5],
-                'current_stock': row[6] or 0,
-                'reserved_stock': row[7] or 0,
-                'available_stock': row[8] or 0,
-                'reorder_point': row[9] or 0,
-                'max_stock': row[10] or 1000,
-                'location': row[11] or 'Unknown',
-                'last_updated': row[12],
-                'delivery_count': row[13],
-                'project_delivered': row[14] if len(row) > 14 else None,
-                'project_used': row[15] if len(row) > 15 else None
-            })
+            cur.execute(SQL_LIST_MATERIALS)
         
-        conn.close()
-        return jsonify(materials)
+        response = stream_json_rows(None, cur, material_dict)
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1985,28 +2912,36 @@ def log_material_usage():
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Get material unit cost
-        cur.execute('SELECT unit_cost FROM materials WHERE id = ?', (material_id,))
+        # Get material unit cost (and name, for the lead-time default below)
+        cur.execute('SELECT unit_cost, name FROM materials WHERE id = ?', (material_id,))
         material = cur.fetchone()
         if not material:
             return jsonify({'error': 'Material not found'}), 404
         
         unit_cost = material[0] or 0
         total_cost = float(quantity_used) * float(unit_cost)
+        current_time = datetime.now().isoformat()
         
-        # Log the usage
+        # Deliveries of this material overall, and to this project (count and total);
+        # logging usage does not change them, so one query up front covers both checks
+        cur.execute("""
+            SELECT COUNT(1),
+                   COUNT(CASE WHEN project_id = ? THEN 1 END),
+                   COALESCE(SUM(CASE WHEN project_id = ? THEN quantity_delivered END), 0)
+            FROM material_deliveries WHERE material_id = ?
+        """, (project_id, project_id, material_id))
+        deliveries_before_usage, deliveries_count, delivered_sum = cur.fetchone()
+        
+        # Log the usage, the inventory update and any alert in one transaction
         cur.execute("""
             INSERT INTO material_usage 
             (project_id, material_id, quantity_used, unit_cost, total_cost, usage_date, logged_by, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (project_id, material_id, quantity_used, unit_cost, total_cost, 
-              datetime.now().isoformat(), logged_by, notes))
+              current_time, logged_by, notes))
+        usage_id = cur.lastrowid
 
         # If no deliveries yet for this material, keep current_stock at zero
-        cur.execute("SELECT COUNT(1) FROM material_deliveries WHERE material_id = ?", (material_id,))
-        deliveries_before_usage_row = cur.fetchone()
-        deliveries_before_usage = deliveries_before_usage_row[0] if deliveries_before_usage_row else 0
-
         if deliveries_before_usage > 0:
             # Update inventory only if at least one delivery has happened
             cur.execute("""
@@ -2014,78 +2949,45 @@ def log_material_usage():
                 SET current_stock = current_stock - ?,
                     last_updated = ?
                 WHERE material_id = ?
-            """, (quantity_used, datetime.now().isoformat(), material_id))
-        
-        conn.commit()
+            """, (quantity_used, current_time, material_id))
         
         # After logging usage, compute dynamic threshold and create alert only if needed
         # Has at least one delivery (first stocking)?
-        cur.execute("""
-            SELECT COUNT(1) FROM material_deliveries WHERE material_id = ? AND project_id = ?
-        """, (material_id, project_id))
-        deliveries_count_row = cur.fetchone()
-        deliveries_count = deliveries_count_row[0] if deliveries_count_row else 0
-
         if deliveries_count > 0:
-            # Compute per-project current stock = deliveries - usage for this project
-            cur.execute("""
-                SELECT COALESCE(SUM(quantity_delivered),0) FROM material_deliveries 
-                WHERE material_id = ? AND project_id = ?
-            """, (material_id, project_id))
-            delivered_sum = cur.fetchone()[0] or 0
-            cur.execute("""
-                SELECT COALESCE(SUM(quantity_used),0) FROM material_usage 
-                WHERE material_id = ? AND project_id = ?
-            """, (material_id, project_id))
-            used_sum = cur.fetchone()[0] or 0
-            project_current_stock = float(delivered_sum) - float(used_sum)
+            # Usage totals for this project: net used (for current stock = deliveries - usage),
+            # and the per-day / per-entry averages behind the threshold and suggestion
+            used_sum, avg_per_day, total_used, num_entries = cur.execute(
+                SQL_PROJECT_USAGE_TOTALS, (int(material_id), int(project_id))).fetchone()
+            project_current_stock = float(delivered_sum or 0) - float(used_sum or 0)
 
-            # Dynamic threshold based on last 30 days and 10% buffer
-            threshold = compute_project_threshold(cur, int(material_id), int(project_id), lookback_days=30, safety_buffer_ratio=0.10)
+            # Dynamic threshold with a 10% buffer
+            name_key = str(material[1]).lower() if material[1] else ''
+            lead_days = int(MATERIAL_DEFAULTS.get(name_key, 90))
+            threshold = usage_threshold(float(avg_per_day or 0), lead_days, safety_buffer_ratio=0.10)
 
             if project_current_stock < threshold and threshold > 0:
                 # Suggested order should suffice next lead-time days (not the threshold window)
-                name_key = ''
-                try:
-                    cur.execute("SELECT name FROM materials WHERE id = ?", (material_id,))
-                    nrow = cur.fetchone()
-                    name_key = str(nrow[0]).lower() if nrow and nrow[0] else ''
-                except Exception:
-                    name_key = ''
-                lead_days = int(MATERIAL_DEFAULTS.get(name_key, 90))
                 buffer_days = 4
-                avg_daily = compute_project_avg_daily(cur, int(material_id), int(project_id), lookback_days=30)
+                avg_daily = float(total_used or 0) / num_entries if num_entries else 0.0
                 target_for_lead = float(avg_daily) * float(max(lead_days + buffer_days, 0))
                 suggested_qty = max(target_for_lead, 0)
 
                 # Create or update alert with dynamic threshold and lead-days suggestion
-                cur.execute("""
-                    INSERT OR REPLACE INTO reorder_alerts 
-                    (id, material_id, project_id, alert_type, current_stock, reorder_point, 
-                     suggested_order_quantity, priority, status, created_at)
-                    VALUES (
-                        (
-                            SELECT id FROM reorder_alerts 
-                            WHERE material_id = ? AND project_id = ? AND status = 'active'
-                            LIMIT 1
-                        ),
-                        ?, ?, ?, ?, ?, ?, ?, 'active', ?
-                    )
-                """, (
-                    material_id, project_id,
+                cur.execute(SQL_UPSERT_ACTIVE_ALERT, (
                     material_id, project_id, 'low_stock', project_current_stock, threshold,
                     suggested_qty,
                     'high' if project_current_stock <= 0 else 'medium',
-                    datetime.now().isoformat()
+                    current_time
                 ))
-                conn.commit()
             # Email notifications removed per requirement
         
+        conn.commit()
         conn.close()
+        invalidate_inventory_dashboard()
         
         return jsonify({
             'message': 'Material usage logged successfully',
-            'usage_id': cur.lastrowid,
+            'usage_id': usage_id,
             'total_cost': total_cost
         })
         
@@ -2120,6 +3022,7 @@ def log_material_delivery():
             unit_cost = material[0] if material else 0
         
         total_cost = float(quantity_delivered) * float(unit_cost)
+        current_time = datetime.now().isoformat()
         
         # Log the delivery
         cur.execute("""
@@ -2128,7 +3031,7 @@ def log_material_delivery():
              delivery_date, received_by, purchase_order_number, invoice_number, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (material_id, project_id, supplier_id, quantity_delivered, unit_cost, total_cost,
-              datetime.now().isoformat(), received_by, purchase_order_number, 
+              current_time, received_by, purchase_order_number, 
               invoice_number, notes))
         
         # Update inventory
@@ -2137,17 +3040,18 @@ def log_material_delivery():
             SET current_stock = current_stock + ?,
                 last_updated = ?
             WHERE material_id = ?
-        """, (quantity_delivered, datetime.now().isoformat(), material_id))
+        """, (quantity_delivered, current_time, material_id))
         
         # If no inventory record exists, create one
         if cur.rowcount == 0:
             cur.execute("""
                 INSERT INTO inventory (material_id, current_stock, reorder_point, max_stock, location, last_updated)
                 VALUES (?, ?, 0.0, 500.0, 'Main Warehouse', ?)
-            """, (material_id, quantity_delivered, datetime.now().isoformat()))
+            """, (material_id, quantity_delivered, current_time))
         
         conn.commit()
         conn.close()
+        invalidate_inventory_dashboard()
         
         return jsonify({
             'message': 'Material delivery logged successfully',
@@ -2158,6 +3062,72 @@ def log_material_delivery():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Active alerts, most urgent first. The last column is compute_project_avg_daily
+# for the alert's material/project (positive usage per positive entry), read
+# from the same daily rollup as SQL_PROJECT_USAGE_STATS but inside the listing
+# query instead of one query per alert.
+ALERT_LIST_SELECT = """
+    SELECT 
+        ra.id, ra.alert_type, ra.current_stock, ra.reorder_point,
+        ra.suggested_order_quantity, ra.priority, ra.created_at,
+        m.name, m.unit, m.category, m.unit_cost, ra.project_id,
+        (
+            SELECT SUM(ud.used_sum) * 1.0 / SUM(ud.used_entries)
+            FROM material_usage_daily ud
+            WHERE ud.material_id = ra.material_id AND ud.project_id = ra.project_id
+        ) as avg_per_entry
+    FROM reorder_alerts ra
+    JOIN materials m ON ra.material_id = m.id
+"""
+ALERT_LIST_ORDER = """
+    ORDER BY 
+        CASE ra.priority 
+            WHEN 'critical' THEN 1 
+            WHEN 'high' THEN 2 
+            WHEN 'medium' THEN 3 
+            ELSE 4 
+        END,
+        ra.created_at DESC
+"""
+# Upserts refresh created_at and acknowledging drops an alert from the active
+# count; the suggestions also follow usage, which is append-only
+ALERT_FINGERPRINT_SELECT = """
+    SELECT COUNT(1), MAX(id), MAX(created_at), (SELECT MAX(id) FROM material_usage)
+    FROM reorder_alerts
+"""
+SQL_ACTIVE_ALERTS_FINGERPRINT = f"{ALERT_FINGERPRINT_SELECT} WHERE status = 'active'"
+SQL_ACTIVE_ALERTS_FINGERPRINT_FOR_PROJECT = f"{ALERT_FINGERPRINT_SELECT} WHERE status = 'active' AND project_id = ?"
+SQL_LIST_ACTIVE_ALERTS = f"{ALERT_LIST_SELECT} WHERE ra.status = 'active' {ALERT_LIST_ORDER}"
+SQL_LIST_ACTIVE_ALERTS_FOR_PROJECT = f"{ALERT_LIST_SELECT} WHERE ra.status = 'active' AND ra.project_id = ? {ALERT_LIST_ORDER}"
+
+# Days of average usage an alert's suggested order covers: lead time + 4 day buffer
+ALERT_COVERAGE_DAYS = {name: float(days + 4) for name, days in MATERIAL_DEFAULTS.items()}
+DEFAULT_ALERT_COVERAGE_DAYS = float(90 + 4)
+
+def reorder_alert_dict(row):
+    alert = {
+        'id': row[0],
+        'alert_type': row[1],
+        'current_stock': row[2],
+        'reorder_point': row[3],
+        'suggested_order_quantity': row[4],
+        'priority': row[5],
+        'created_at': row[6],
+        'material_name': row[7],
+        'unit': row[8],
+        'category': row[9],
+        'unit_cost': row[10],
+        'project_id': row[11]
+    }
+
+    # Recompute suggested order using coverage = lead time days (+4 buffer) only
+    if alert['project_id']:
+        avg_daily = row[12] or 0.0
+        name_key = str(alert['material_name']).lower() if alert['material_name'] else ''
+        target_qty = float(avg_daily) * ALERT_COVERAGE_DAYS.get(name_key, DEFAULT_ALERT_COVERAGE_DAYS)
+        alert['suggested_order_quantity'] = max(target_qty, 0)
+    return alert
+
 @app.route('/inventory/alerts', methods=['GET'])
 def get_reorder_alerts():
     """Get all active reorder alerts"""
@@ -2168,79 +3138,21 @@ def get_reorder_alerts():
         # Optional project_id filter
         project_id = request.args.get('project_id', type=int)
         if project_id:
-            cur.execute("""
-                SELECT 
-                    ra.id, ra.alert_type, ra.current_stock, ra.reorder_point,
-                    ra.suggested_order_quantity, ra.priority, ra.created_at,
-                    m.name, m.unit, m.category, m.unit_cost, ra.project_id
-                FROM reorder_alerts ra
-                JOIN materials m ON ra.material_id = m.id
-                WHERE ra.status = 'active' AND ra.project_id = ?
-                ORDER BY 
-                    CASE ra.priority 
-                        WHEN 'critical' THEN 1 
-                        WHEN 'high' THEN 2 
-                        WHEN 'medium' THEN 3 
-                        ELSE 4 
-                    END,
-                    ra.created_at DESC
-            """, (project_id,))
+            etag = listing_etag(cur, SQL_ACTIVE_ALERTS_FINGERPRINT_FOR_PROJECT, (project_id,))
         else:
-            cur.execute("""
-                SELECT 
-                    ra.id, ra.alert_type, ra.current_stock, ra.reorder_point,
-                    ra.suggested_order_quantity, ra.priority, ra.created_at,
-                    m.name, m.unit, m.category, m.unit_cost, ra.project_id
-                FROM reorder_alerts ra
-                JOIN materials m ON ra.material_id = m.id
-                WHERE ra.status = 'active'
-                ORDER BY 
-                    CASE ra.priority 
-                        WHEN 'critical' THEN 1 
-                        WHEN 'high' THEN 2 
-                        WHEN 'medium' THEN 3 
-                        ELSE 4 
-                    END,
-                    ra.created_at DESC
-            """)
-        
-        base_rows = cur.fetchall()
-
-        alerts = []
-        for row in base_rows:
-            alert = {
-                'id': row[0],
-                'alert_type': row[1],
-                'current_stock': row[2],
-                'reorder_point': row[3],
-                'suggested_order_quantity': row[4],
-                'priority': row[5],
-                'created_at': row[6],
-                'material_name': row[7],
-                'unit': row[8],
-                'category': row[9],
-                'unit_cost': row[10],
-                'project_id': row[11]
-            }
-
-            # Recompute suggested order using coverage = lead time days (+4 buffer) only
-            if alert['project_id']:
-                # Look up material_id via alert id
-                cur.execute("SELECT material_id FROM reorder_alerts WHERE id = ?", (alert['id'],))
-                row_mid = cur.fetchone()
-                if row_mid:
-                    material_id = int(row_mid[0])
-                    avg_daily = compute_project_avg_daily(cur, material_id, int(alert['project_id']), lookback_days=30)
-                    name_key = str(alert['material_name']).lower() if alert['material_name'] else ''
-                    cov_days = int(MATERIAL_DEFAULTS.get(name_key, 90))
-                    buffer_days = 4
-                    target_qty = float(avg_daily) * float(max(cov_days + buffer_days, 0))
-                    recomputed = max(target_qty, 0)
-                    alert['suggested_order_quantity'] = recomputed
-            alerts.append(alert)
+            etag = listing_etag(cur, SQL_ACTIVE_ALERTS_FINGERPRINT)
+        if request.if_none_match.contains(etag):
+            conn.close()
+            return not_modified(etag)
         
-        conn.close()
-        return jsonify(alerts)
+        if project_id:
+            cur.execute(SQL_LIST_ACTIVE_ALERTS_FOR_PROJECT, (project_id,))
+        else:
+            cur.execute(SQL_LIST_ACTIVE_ALERTS)
+        
+        response = stream_json_rows(None, cur, reorder_alert_dict)
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -2274,111 +3186,127 @@ def acknowledge_alert(alert_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Inventory summary
+SQL_DASHBOARD_SUMMARY = """
+    SELECT 
+        COUNT(*) as total_materials,
+        SUM(CASE WHEN i.current_stock <= i.reorder_point THEN 1 ELSE 0 END) as low_stock_count,
+        SUM(CASE WHEN i.current_stock <= 0 THEN 1 ELSE 0 END) as stockout_count,
+        SUM(i.current_stock * m.unit_cost) as total_inventory_value
+    FROM materials m
+    LEFT JOIN inventory i ON m.id = i.material_id
+"""
+# Recent usage
+SQL_DASHBOARD_RECENT_USAGE = """
+    SELECT 
+        mu.usage_date AS date, mu.quantity_used AS quantity, mu.total_cost AS cost,
+        m.name AS material, m.unit, p.location AS project_location
+    FROM material_usage mu
+    JOIN materials m ON mu.material_id = m.id
+    JOIN projects p ON mu.project_id = p.id
+    ORDER BY mu.usage_date DESC, mu.id DESC
+    LIMIT 10
+"""
+# Recent deliveries
+SQL_DASHBOARD_RECENT_DELIVERIES = """
+    SELECT 
+        md.delivery_date AS date, md.quantity_delivered AS quantity, md.total_cost AS cost,
+        m.name AS material, m.unit, COALESCE(NULLIF(s.name, ''), 'Unknown') AS supplier
+    FROM material_deliveries md
+    JOIN materials m ON md.material_id = m.id
+    LEFT JOIN suppliers s ON md.supplier_id = s.id
+    ORDER BY md.delivery_date DESC, md.id DESC
+    LIMIT 10
+"""
+# Top consuming materials since the given time
+SQL_DASHBOARD_TOP_CONSUMING = """
+    SELECT 
+        m.name AS material, m.unit, SUM(mu.quantity_used) as total_used,
+        SUM(mu.total_cost) as total_cost
+    FROM material_usage mu
+    JOIN materials m ON mu.material_id = m.id
+    WHERE mu.usage_date >= ?
+    GROUP BY m.id, m.name, m.unit
+    ORDER BY total_used DESC
+    LIMIT 5
+"""
+
+# The dashboard sections are independent reads, so each runs on its own pooled
+# connection and they overlap (sqlite3 releases the GIL while a query runs)
+_DASHBOARD_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard')
+
+def fetch_all(sql, params=()):
+    """Runs one read query on a connection of its own and returns all rows."""
+    conn = get_db_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+# The dashboard is served from memory for up to DASHBOARD_TTL seconds. Every
+# committed write to the tables it reads calls invalidate_inventory_dashboard,
+# which moves lookups on to a fresh cache key.
+DASHBOARD_TTL = 60
+_dashboard_generation = 0
+
+def invalidate_inventory_dashboard():
+    global _dashboard_generation
+    _dashboard_generation += 1
+
+@lru_cache(maxsize=4)
+def _inventory_dashboard_body(generation, ttl_bucket):
+    # Top consuming materials cover the last 30 days
+    thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
+    futures = [
+        _DASHBOARD_EXECUTOR.submit(fetch_all, SQL_DASHBOARD_SUMMARY),
+        _DASHBOARD_EXECUTOR.submit(fetch_all, SQL_DASHBOARD_RECENT_USAGE),
+        _DASHBOARD_EXECUTOR.submit(fetch_all, SQL_DASHBOARD_RECENT_DELIVERIES),
+        _DASHBOARD_EXECUTOR.submit(fetch_all, SQL_DASHBOARD_TOP_CONSUMING, (thirty_days_ago,)),
+    ]
+    (summary,), recent_usage, recent_deliveries, top_consuming = [future.result() for future in futures]
+    
+    # Columns are aliased to the response keys, so each row converts with dict()
+    return app.json.response({
+        'summary': {key: value or 0 for key, value in dict(summary).items()},
+        'recent_usage': [dict(row) for row in recent_usage],
+        'recent_deliveries': [dict(row) for row in recent_deliveries],
+        'top_consuming': [dict(row) for row in top_consuming]
+    }).get_data()
+
 @app.route('/inventory/dashboard', methods=['GET'])
 def get_inventory_dashboard():
     """Get inventory dashboard data"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get inventory summary
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total_materials,
-                SUM(CASE WHEN i.current_stock <= i.reorder_point THEN 1 ELSE 0 END) as low_stock_count,
-                SUM(CASE WHEN i.current_stock <= 0 THEN 1 ELSE 0 END) as stockout_count,
-                SUM(i.current_stock * m.unit_cost) as total_inventory_value
-            FROM materials m
-            LEFT JOIN inventory i ON m.id = i.material_id
-        """)
-        summary = cur.fetchone()
-        
-        # Get recent usage
-        cur.execute("""
-            SELECT 
-                mu.usage_date, mu.quantity_used, mu.total_cost,
-                m.name, m.unit, p.location
-            FROM material_usage mu
-            JOIN materials m ON mu.material_id = m.id
-            JOIN projects p ON mu.project_id = p.id
-            ORDER BY mu.usage_date DESC
-            LIMIT 10
-        """)
-        recent_usage = cur.fetchall()
-        
-        # Get recent deliveries
-        cur.execute("""
-            SELECT 
-                md.delivery_date, md.quantity_delivered, md.total_cost,
-                m.name, m.unit, s.name as supplier_name
-            FROM material_deliveries md
-            JOIN materials m ON md.material_id = m.id
-            LEFT JOIN suppliers s ON md.supplier_id = s.id
-            ORDER BY md.delivery_date DESC
-            LIMIT 10
-        """)
-        recent_deliveries = cur.fetchall()
-        
-        # Get top consuming materials (last 30 days)
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-        cur.execute("""
-            SELECT 
-                m.name, m.unit, SUM(mu.quantity_used) as total_used,
-                SUM(mu.total_cost) as total_cost
-            FROM material_usage mu
-            JOIN materials m ON mu.material_id = m.id
-            WHERE mu.usage_date >= ?
-            GROUP BY m.id, m.name, m.unit
-            ORDER BY total_used DESC
-            LIMIT 5
-        """, (thirty_days_ago,))
-        top_consuming = cur.fetchall()
-        
-        conn.close()
-        
-        return jsonify({
-            'summary': {
-                'total_materials': summary[0] or 0,
-                'low_stock_count': summary[1] or 0,
-                'stockout_count': summary[2] or 0,
-                'total_inventory_value': summary[3] or 0
-            },
-            'recent_usage': [
-                {
-                    'date': row[0],
-                    'quantity': row[1],
-                    'cost': row[2],
-                    'material': row[3],
-                    'unit': row[4],
-                    'project_location': row[5]
-                }
-                for row in recent_usage
-            ],
-            'recent_deliveries': [
-                {
-                    'date': row[0],
-                    'quantity': row[1],
-                    'cost': row[2],
-                    'material': row[3],
-                    'unit': row[4],
-                    'supplier': row[5] or 'Unknown'
-                }
-                for row in recent_deliveries
-            ],
-            'top_consuming': [
-                {
-                    'material': row[0],
-                    'unit': row[1],
-                    'total_used': row[2],
-                    'total_cost': row[3]
-                }
-                for row in top_consuming
-            ]
-        })
+        body = _inventory_dashboard_body(_dashboard_generation, int(time.monotonic() // DASHBOARD_TTL))
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Per material with positive average daily usage since the given day: that
+# average and the primary supplier's lead time (7 days without one)
+SQL_REORDER_POINT_INPUTS = """
+    WITH daily AS (
+        SELECT material_id, SUM(quantity_sum) AS daily_usage
+        FROM material_usage_daily
+        WHERE usage_day >= ?
+        GROUP BY material_id, usage_day
+    ), usage AS (
+        SELECT material_id, AVG(daily_usage) AS avg_daily_usage
+        FROM daily GROUP BY material_id
+    )
+    SELECT m.id, usage.avg_daily_usage,
+           COALESCE((
+               SELECT s.lead_time_days FROM suppliers s
+               JOIN material_suppliers ms ON s.id = ms.supplier_id
+               WHERE ms.material_id = m.id AND ms.is_primary = 1
+               LIMIT 1
+           ), 7)
+    FROM materials m
+    JOIN usage ON usage.material_id = m.id
+    WHERE usage.avg_daily_usage > 0
+"""
+
 @app.route('/inventory/project-usage/<project_id>', methods=['GET'])
 def get_project_material_usage(project_id):
     """Get material usage for a specific project"""
@@ -2390,223 +3318,190 @@ def get_project_material_usage(project_id):
             SELECT 
                 mu.id, mu.quantity_used, mu.unit_cost, mu.total_cost, 
                 mu.usage_date, mu.notes,
-                m.name, m.unit, m.category,
-                u.fullname as logged_by_name
+                m.name as material_name, m.unit, m.category,
+                u.fullname as logged_by
             FROM material_usage mu
             JOIN materials m ON mu.material_id = m.id
             JOIN users u ON mu.logged_by = u.id
             WHERE mu.project_id = ?
-            ORDER BY mu.usage_date DESC
+            ORDER BY mu.usage_date DESC, mu.id DESC
         """, (project_id,))
         
-        usage_records = []
-        for row in cur.fetchall():
-            usage_records.append({
-                'id': row[0],
-                'quantity_used': row[1],
-                'unit_cost': row[2],
-                'total_cost': row[3],
-                'usage_date': row[4],
-                'notes': row[5],
-                'material_name': row[6],
-                'unit': row[7],
-                'category': row[8],
-                'logged_by': row[9]
-            })
-        
-        conn.close()
-        return jsonify(usage_records)
+        # Written out as the rows are read; the columns are aliased to the response keys
+        return stream_json_rows(None, cur, dict)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # --- BACKGROUND TASKS FOR INVENTORY MONITORING ---
 
+# Watermark of what each monitoring task reads, as of its last completed run.
+# A run that finds the same watermark has nothing new to do and returns early;
+# after a restart the first run of each task always does the work.
+_task_watermarks = {}
+
+# Usage (reservations included) is append-only, and only materials that have an
+# inventory row get a reorder point. Suppliers are only edited outside the app.
+SQL_REORDER_POINT_WATERMARK = """
+    SELECT (SELECT MAX(id) FROM material_usage), (SELECT COUNT(1) FROM inventory)
+"""
+
 def calculate_reorder_points():
     """Calculate dynamic reorder points based on usage patterns"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get all materials
-        cur.execute('SELECT id FROM materials')
-        materials = cur.fetchall()
-        
-        for material in materials:
-            material_id = material[0]
-            
-            # Calculate average daily usage (last 30 days)
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            cur.execute("""
-                SELECT AVG(daily_usage) FROM (
-                    SELECT DATE(usage_date) as usage_day, SUM(quantity_used) as daily_usage
-                    FROM material_usage 
-                    WHERE material_id = ? AND usage_date >= ?
-                    GROUP BY DATE(usage_date)
-                )
-            """, (material_id, thirty_days_ago))
-            
-            result = cur.fetchone()
-            avg_daily_usage = result[0] if result[0] else 0
-            
-            if avg_daily_usage > 0:
-                # Get primary supplier lead time
-                cur.execute("""
-                    SELECT s.lead_time_days FROM suppliers s
-                    JOIN material_suppliers ms ON s.id = ms.supplier_id
-                    WHERE ms.material_id = ? AND ms.is_primary = 1
-                    LIMIT 1
-                """, (material_id,))
-                
-                supplier = cur.fetchone()
-                lead_time = supplier[0] if supplier else 7  # Default 7 days
-                
+        # Released even when a query fails (this runs outside any request)
+        with closing(get_db_connection()) as conn:
+            cur = conn.cursor()
+        
+            now = datetime.now()
+            current_time = now.isoformat()
+            thirty_days_ago = (now - timedelta(days=30)).date().isoformat()
+        
+            # Nothing to recalculate while no usage was logged and the 30-day window
+            # has not moved on to a new day
+            watermark = (thirty_days_ago, *cur.execute(SQL_REORDER_POINT_WATERMARK).fetchone())
+            if _task_watermarks.get('calculate_reorder_points') == watermark:
+                return
+        
+            # Average daily usage (last 30 days) and primary supplier lead time of
+            # every material that has been used, in one query
+            cur.execute(SQL_REORDER_POINT_INPUTS, (thirty_days_ago,))
+        
+            updates = []
+            for material_id, avg_daily_usage, lead_time in cur.fetchall():
                 # Calculate reorder point: (avg_daily_usage * lead_time) + safety_stock
                 safety_stock = avg_daily_usage * 3  # 3 days safety stock
                 new_reorder_point = (avg_daily_usage * lead_time) + safety_stock
-                
-                # Update reorder point
-                cur.execute("""
-                    UPDATE inventory 
-                    SET reorder_point = ?, last_updated = ?
-                    WHERE material_id = ?
-                """, (new_reorder_point, datetime.now().isoformat(), material_id))
+                updates.append((new_reorder_point, current_time, material_id))
         
-        conn.commit()
-        conn.close()
-        print(f"Reorder points recalculated at {datetime.now()}")
+            # Update reorder points
+            cur.executemany("""
+                UPDATE inventory 
+                SET reorder_point = ?, last_updated = ?
+                WHERE material_id = ?
+            """, updates)
+        
+            conn.commit()
+        invalidate_inventory_dashboard()
+        _task_watermarks['calculate_reorder_points'] = watermark
+        print(f"Reorder points recalculated at {now}")
         
     except Exception as e:
         print(f"Error calculating reorder points: {e}")
 
+# Upserts an active alert for every project/material pair with at least one
+# delivery (to a project that still exists) whose stock, from inventory_project,
+# is below the usage_threshold of its average positive usage per day. Only
+# pairs with positive usage since the cutoff time, or whose material has
+# reserved stock, are checked. Lead days come from the MATERIAL_DEFAULTS JSON
+# (90 days for the threshold, 75 for the suggested quantity when a material
+# has no default). The suggested quantity covers lead + 4 days at the
+# average per positive entry.
+SQL_CREATE_ALERTS = f"""
+    WITH u AS (
+        SELECT material_id, project_id, AVG(used_sum) AS avg_per_day,
+               SUM(used_sum) AS total_used, SUM(used_entries) AS entries
+        FROM material_usage_daily GROUP BY material_id, project_id
+    ), pairs AS (
+        SELECT ip.material_id, ip.project_id, ip.current_stock AS stock,
+               COALESCE(u.avg_per_day, 0) * MAX(COALESCE(defaults.value, 90) + 3, 0) * 1.1 AS threshold,
+               CASE WHEN u.entries > 0 THEN CAST(u.total_used AS REAL) / u.entries ELSE 0.0 END
+                   * MAX(COALESCE(defaults.value, 75) + 4, 0) AS suggested
+        FROM inventory_project ip
+        JOIN materials m ON m.id = ip.material_id
+        JOIN projects p ON p.id = ip.project_id
+        LEFT JOIN u ON u.material_id = ip.material_id AND u.project_id = ip.project_id
+        LEFT JOIN inventory i ON i.material_id = ip.material_id
+        LEFT JOIN json_each(?) defaults ON defaults.key = LOWER(m.name)
+        WHERE ip.delivery_count > 0
+          AND (COALESCE(i.reserved_stock, 0) > 0 OR EXISTS (
+               SELECT 1 FROM material_usage mu
+               WHERE mu.material_id = ip.material_id AND mu.project_id = ip.project_id
+                 AND mu.usage_date >= ? AND mu.quantity_used > 0
+          ))
+    )
+    INSERT INTO reorder_alerts
+    (material_id, project_id, alert_type, current_stock, reorder_point,
+     suggested_order_quantity, priority, status, created_at)
+    SELECT material_id, project_id,
+           CASE WHEN stock <= 0 THEN 'stockout' ELSE 'low_stock' END,
+           stock, threshold, MAX(suggested, 0),
+           CASE WHEN stock <= 0 THEN 'critical' ELSE 'high' END,
+           'active', ?
+    FROM pairs
+    WHERE threshold > 0 AND stock < threshold
+    ORDER BY material_id, project_id
+    {ALERT_UPSERT_CONFLICT}
+"""
+
+# Deliveries and usage (reservations, and so reserved stock, included) are
+# append-only, and alerts only ever leave the active set. As the recent-usage
+# cutoff moves on, pairs can only drop out, which leaves their alerts as they are.
+SQL_ALERT_CHECK_WATERMARK = """
+    SELECT (SELECT MAX(id) FROM material_deliveries), (SELECT MAX(id) FROM material_usage),
+           (SELECT COUNT(1) FROM reorder_alerts WHERE status != 'active')
+"""
+
 def check_inventory_alerts():
     """Check for low stock and create alerts using dynamic per-project threshold"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Iterate materials and projects; evaluate dynamic thresholds and upsert alerts
-        cur.execute("SELECT id, name FROM materials")
-        materials = cur.fetchall()
-        sixty_days_ago = (datetime.now() - timedelta(days=60)).isoformat()
-
-        for m in materials:
-            material_id = m['id'] if isinstance(m, sqlite3.Row) else m[0]
-            material_name = m['name'] if isinstance(m, sqlite3.Row) else m[1]
-
-            # Projects that have any usage or deliveries for this material
-            cur.execute(
-                """
-                    SELECT DISTINCT p.id
-                    FROM projects p
-                    LEFT JOIN material_deliveries md ON md.project_id = p.id AND md.material_id = ?
-                    LEFT JOIN material_usage mu ON mu.project_id = p.id AND mu.material_id = ?
-                    WHERE md.id IS NOT NULL OR mu.id IS NOT NULL
-                """,
-                (material_id, material_id)
-            )
-            project_rows = cur.fetchall()
-
-            for pr in project_rows:
-                project_id = pr['id'] if isinstance(pr, sqlite3.Row) else pr[0]
-
-                # Require at least one delivery for this project/material
-                cur.execute("SELECT COUNT(1) FROM material_deliveries WHERE material_id = ? AND project_id = ?", (material_id, project_id))
-                deliveries_count = cur.fetchone()[0] or 0
-                if deliveries_count == 0:
-                    continue
-
-                # Project current stock = deliveries - usage
-                cur.execute("SELECT COALESCE(SUM(quantity_delivered),0) FROM material_deliveries WHERE material_id = ? AND project_id = ?", (material_id, project_id))
-                delivered_sum = cur.fetchone()[0] or 0
-                cur.execute("SELECT COALESCE(SUM(quantity_used),0) FROM material_usage WHERE material_id = ? AND project_id = ?", (material_id, project_id))
-                used_sum = cur.fetchone()[0] or 0
-                project_current_stock = float(delivered_sum) - float(used_sum)
-
-                # Require recent usage activity (last 60 days) or any reservations
-                cur.execute("""
-                    SELECT COUNT(1) FROM material_usage 
-                    WHERE material_id = ? AND project_id = ? AND usage_date >= ? AND quantity_used > 0
-                """, (material_id, project_id, sixty_days_ago))
-                recent_usage_count = cur.fetchone()[0] or 0
-                if recent_usage_count == 0:
-                    cur.execute("SELECT reserved_stock FROM inventory WHERE material_id = ?", (material_id,))
-                    rr = cur.fetchone()
-                    reserved_stock = rr[0] if rr and rr[0] is not None else 0
-                    if reserved_stock <= 0:
-                        continue
-
-                # Dynamic threshold per project/material
-                threshold = compute_project_threshold(cur, int(material_id), int(project_id), lookback_days=30, safety_buffer_ratio=0.10)
-                if threshold <= 0:
-                    continue
-
-                if project_current_stock < threshold:
-                    alert_type = 'stockout' if project_current_stock <= 0 else 'low_stock'
-                    priority = 'critical' if project_current_stock <= 0 else 'high'
-
-                    # Suggest enough to cover next lead-time days
-                    cur.execute("SELECT name FROM materials WHERE id = ?", (material_id,))
-                    nrow = cur.fetchone()
-                    name_key = str(nrow[0]).lower() if nrow and nrow[0] else ''
-                    lead_days = int(MATERIAL_DEFAULTS.get(name_key, 75))
-                    buffer_days = 4
-                    avg_daily = compute_project_avg_daily(cur, int(material_id), int(project_id), lookback_days=30)
-                    target_for_lead = float(avg_daily) * float(max(lead_days + buffer_days, 0))
-                    suggested_qty = max(target_for_lead, 0)
-
-                    cur.execute(
-                        """
-                            INSERT OR REPLACE INTO reorder_alerts 
-                            (id, material_id, project_id, alert_type, current_stock, reorder_point,
-                             suggested_order_quantity, priority, status, created_at)
-                            VALUES (
-                                (
-                                    SELECT id FROM reorder_alerts 
-                                    WHERE material_id = ? AND project_id = ? AND status = 'active'
-                                    LIMIT 1
-                                ),
-                                ?, ?, ?, ?, ?, ?, ?, 'active', ?
-                            )
-                        """,
-                        (
-                            material_id, project_id,
-                            material_id, project_id, alert_type, project_current_stock, threshold,
-                            suggested_qty,
-                            priority,
-                            datetime.now().isoformat()
-                        )
-                    )
-        
-        conn.commit()
-        conn.close()
+        # One statement decides and upserts every alert, inside one write transaction
+        with closing(get_db_connection()) as conn, conn:
+            cur = conn.cursor()
+            cur.execute('BEGIN IMMEDIATE')
+            
+            # Nothing the alerts depend on has changed since the last run
+            watermark = tuple(cur.execute(SQL_ALERT_CHECK_WATERMARK).fetchone())
+            if _task_watermarks.get('check_inventory_alerts') == watermark:
+                return
+            
+            now = datetime.now()
+            current_time = now.isoformat()
+            sixty_days_ago = (now - timedelta(days=60)).isoformat()
+
+            cur.execute(SQL_CREATE_ALERTS, (app.json.dumps(MATERIAL_DEFAULTS), sixty_days_ago, current_time))
+        _task_watermarks['check_inventory_alerts'] = watermark
         
     except Exception as e:
         print(f"Error checking inventory alerts: {e}")
 
-def inventory_monitoring_task():
-    """Background task for inventory monitoring"""
+# Seconds between runs of each monitoring task, plus up to the jitter at random.
+# Each task runs on its own thread, so the quick alert check does not queue
+# behind the reorder-point pass and the two do not wake together.
+ALERT_CHECK_INTERVAL = 15 * 60
+ALERT_CHECK_JITTER = 60
+REORDER_POINT_INTERVAL = 6 * 3600
+REORDER_POINT_JITTER = 300
+
+def inventory_monitoring_task(task, interval, jitter):
+    """Background task for inventory monitoring: runs task every interval (+ jitter) seconds"""
     while True:
+        time.sleep(interval + random.uniform(0, jitter))
         try:
-            # Run every hour
-            time.sleep(3600)
-            calculate_reorder_points()
-            check_inventory_alerts()
+            task()
         except Exception as e:
-            print(f"Error in inventory monitoring task: {e}")
-            time.sleep(300)  # Wait 5 minutes before retrying
+            # The next run stays on schedule
+            print(f"Error in inventory monitoring task {task.__name__}: {e}")
 
 # Start inventory monitoring in background
 def start_inventory_monitoring():
-    monitoring_thread = threading.Thread(target=inventory_monitoring_task, daemon=True)
-    monitoring_thread.start()
+    for task, interval, jitter in (
+        (calculate_reorder_points, REORDER_POINT_INTERVAL, REORDER_POINT_JITTER),
+        (check_inventory_alerts, ALERT_CHECK_INTERVAL, ALERT_CHECK_JITTER),
+    ):
+        threading.Thread(target=inventory_monitoring_task, args=(task, interval, jitter),
+                         daemon=True, name=task.__name__).start()
     print("Inventory monitoring started")
 
 if __name__ == "__main__":
     init_periodic_db()
     if LOADED_MODELS:
         start_inventory_monitoring()
-        app.run(debug=True, host="0.0.0.0", port=5002)
+        # Debug mode's reloader imports the app (and loads every model) twice and its
+        # debugger wraps each request, so it is opt-in: FLASK_DEBUG=1 python app.py
+        debug = os.environ.get("FLASK_DEBUG") == "1"
+        # One thread per request; predictions from concurrent requests are batched
+        app.run(debug=debug, host="0.0.0.0", port=5002, threaded=True)
     else:
         print("Application startup failed due to model loading error.")
 
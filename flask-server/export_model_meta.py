@@ -0,0 +1,23 @@
+"""
+Writes <model>_meta.npz for every model: the column list plus the scaler
+reduced to float32 mean/inv_scale arrays. app.py reads these instead of the
+joblib scaler and column files while they are newer, so startup does not
+import joblib or unpickle sklearn objects.
+
+Run from the flask-server directory after replacing any scaler or column file:
+    python export_model_meta.py
+"""
+import numpy as np
+
+from app import LOADED_MODELS, _meta_path
+
+if __name__ == "__main__":
+    for model_name, model_assets in LOADED_MODELS.items():
+        np.savez(
+            _meta_path(model_name),
+            columns=np.array(model_assets["columns"], dtype=str),
+            mean=model_assets["mean"],
+            inv_scale=model_assets["inv_scale"],
+            scaler_type=np.array(model_assets["scaler_type"]),
+        )
+        print(f"Saved {_meta_path(model_name)}")
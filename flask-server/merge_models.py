@@ -0,0 +1,91 @@
+"""
+Builds merged_models.onnx: all models from MODEL_ASSET_MAPPING combined into
+one ONNX graph, each branch with its scaler folded in as Sub/Mul nodes, so
+/predict_all runs a single session instead of seven. Models with identical
+columns share one "<first model>_features" input. Branches are taken from
+the same files app.py loads, so int8 models from quantize_models.py are merged
+as quantized.
+
+Run from the flask-server directory after retraining or replacing any model,
+scaler or column file (app.py ignores a merged model older than its sources):
+    python merge_models.py
+"""
+import os
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnx import compose, helper, numpy_helper
+
+from app import (BASE_DIR, FEATURE_SOURCES, LOADED_MODELS, MERGED_INPUT_MODELS, MERGED_MODEL_FILE,
+                 MODEL_ASSET_MAPPING, MODEL_NAMES, create_feature_vector, run_model)
+
+
+def build_merged_model():
+    nodes, initializers, value_infos, inputs, outputs = [], [], [], [], []
+    opsets = {}
+    ir_version = 0
+
+    for model_name in MODEL_ASSET_MAPPING:
+        model_assets = LOADED_MODELS.get(model_name)
+        if model_assets is None:
+            raise SystemExit(f"{model_name.upper()} did not load, not building a merged model.")
+
+        prefix = f"{model_name}/"
+        model = onnx.load(model_assets["onnx_path"])
+        graph = compose.add_prefix(model, prefix=prefix).graph
+
+        # Scaling: (features - mean) * inv_scale feeds the branch's original input
+        features = f"{MODEL_NAMES[FEATURE_SOURCES[MODEL_NAMES.index(model_name)]]}_features"
+        if features not in {i.name for i in inputs}:
+            inputs.append(helper.make_tensor_value_info(features, onnx.TensorProto.FLOAT, [1, len(model_assets["columns"])]))
+        initializers += [
+            numpy_helper.from_array(model_assets["mean"], prefix + "scaler_mean"),
+            numpy_helper.from_array(model_assets["inv_scale"], prefix + "scaler_inv_scale"),
+        ]
+        nodes += [
+            helper.make_node("Sub", [features, prefix + "scaler_mean"], [prefix + "centered"]),
+            helper.make_node("Mul", [prefix + "centered", prefix + "scaler_inv_scale"], [prefix + model_assets["input_name"]]),
+        ]
+
+        nodes += graph.node
+        initializers += graph.initializer
+        value_infos += graph.value_info
+
+        # Expose the branch's prediction under a stable name
+        branch_output = next(o for o in graph.output if o.name == prefix + model_assets["output_name"])
+        prediction = onnx.ValueInfoProto()
+        prediction.CopyFrom(branch_output)
+        prediction.name = f"{model_name}_prediction"
+        nodes.append(helper.make_node("Identity", [branch_output.name], [prediction.name]))
+        outputs.append(prediction)
+
+        for opset in model.opset_import:
+            opsets[opset.domain] = max(opsets.get(opset.domain, 0), opset.version)
+        ir_version = max(ir_version, model.ir_version)
+
+    graph = helper.make_graph(nodes, "merged_models", inputs, outputs, initializers, value_info=value_infos)
+    merged = helper.make_model(graph, opset_imports=[helper.make_opsetid(d, v) for d, v in opsets.items()])
+    merged.ir_version = ir_version
+    onnx.checker.check_model(merged)
+    return merged
+
+
+def check_merged_model(path):
+    """Compare the merged graph against the per-model path on a sample input."""
+    sample = {"budget": "5000000", "towerType": "220 kV", "location": "Mumbai", "geo": "Urban", "taxes": "Yes"}
+    session = ort.InferenceSession(path)
+    feeds = {f"{name}_features": create_feature_vector(sample, LOADED_MODELS[name]).reshape(1, -1)
+             for name in MERGED_INPUT_MODELS}
+    merged = dict(zip([o.name for o in session.get_outputs()], session.run(None, feeds)))
+    for model_name, model_assets in LOADED_MODELS.items():
+        expected = run_model(model_assets, create_feature_vector(sample, model_assets))
+        actual = float(np.asarray(merged[f"{model_name}_prediction"]).flatten()[0])
+        print(f"{model_name}: per-model={expected:.6f} merged={actual:.6f}")
+
+
+if __name__ == "__main__":
+    merged_path = os.path.join(BASE_DIR, MERGED_MODEL_FILE)
+    onnx.save(build_merged_model(), merged_path)
+    print(f"Saved merged model to {merged_path}")
+    check_merged_model(merged_path)
@@ -0,0 +1,49 @@
+"""
+Writes an int8 copy (<model>.int8.onnx) of every model next to its float
+model using ONNX Runtime dynamic quantization, then prints how far each
+quantized model drifts from the float one on a sample input. Copies that
+drift by more than MAX_RELATIVE_DRIFT are deleted again, so that model
+keeps running in float.
+
+app.py loads the int8 copy instead of the float model while it is newer than
+the float file; delete the .int8.onnx files to go back. Rerun
+merge_models.py afterwards if a merged model is in use.
+    python quantize_models.py
+"""
+import os
+
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from app import BASE_DIR, LOADED_MODELS, MODEL_ASSET_MAPPING, QUANTIZED_SUFFIX, create_feature_vector
+
+# Largest |int8 - float| / |float| on the sample input for an int8 copy to be kept
+MAX_RELATIVE_DRIFT = 0.01
+
+
+def predict(path, scaled_input):
+    session = ort.InferenceSession(path)
+    return float(session.run(None, {session.get_inputs()[0].name: scaled_input})[0].flatten()[0])
+
+
+if __name__ == "__main__":
+    sample = {"budget": "5000000", "towerType": "220 kV", "location": "Mumbai", "geo": "Urban", "taxes": "Yes"}
+    for model_name, paths in MODEL_ASSET_MAPPING.items():
+        model_assets = LOADED_MODELS.get(model_name)
+        if model_assets is None:
+            print(f"Skipping {model_name.upper()}: it did not load.")
+            continue
+
+        float_path = os.path.join(BASE_DIR, paths["onnx"])
+        quantized_path = float_path[:-len(".onnx")] + QUANTIZED_SUFFIX
+        quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+
+        features = create_feature_vector(sample, model_assets).reshape(1, -1)
+        scaled_input = (features - model_assets["mean"]) * model_assets["inv_scale"]
+        expected = predict(float_path, scaled_input)
+        actual = predict(quantized_path, scaled_input)
+        drift = abs(actual - expected)
+        print(f"{model_name}: float={expected:.6f} int8={actual:.6f} drift={drift:.6f}")
+        if drift > MAX_RELATIVE_DRIFT * max(abs(expected), 1e-6):
+            os.remove(quantized_path)
+            print(f"  drift is above {MAX_RELATIVE_DRIFT:.0%}; removed {quantized_path}, {model_name} stays float")